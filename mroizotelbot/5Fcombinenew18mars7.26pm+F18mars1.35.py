@@ -9,25 +9,36 @@ Features:
 """
 import os
 import asyncio
+import importlib
 import logging
-import praw
 import time
-import aiohttp
-import schedule
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-import nest_asyncio
-from gtts import gTTS
 from telegram import Update, BotCommand
+from telegram.error import BadRequest
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-import speech_recognition as sr
-from googletrans import Translator, LANGUAGES
-from io import BytesIO
 from typing import Optional
-import argostranslate.package
-import argostranslate.translate
+from admission import AdmissionController, parse_limits
+from audio import AudioTooLong, NotUnderstood, VoicePipeline
+from http_client import HttpClient, HttpSettings
+from llm_cache import ResponseCache
+from loop_monitor import LoopLagMonitor
+from metrics import Metrics, MetricsServer
+from reddit_io import RedditGateway
+from resilience import CircuitOpen, DeadlineExceeded, Resilience
+from routing import Route, Router, parse_routes
+from scheduler import AutoCommentScheduler
+from seen_index import SeenPostIndex
+from streaming import stream_reply
+from stt import GoogleBackend, OpenRouterBackend, SpeechBackends, StubBackend, VoiceInput, VoskBackend, telegram_file_chunks
+from tracing import SamplingProfiler, TracedRequest, Tracer, span
+from tts import ChunkedSynthesizer, TTSCache
+from translation import PackageManager, TranslationBatcher, TranslationBusy, TranslationPool, parse_pairs
+from runner import ChatOrderedUpdateProcessor, run, serve_polling
+from webhook import WebhookSettings, serve_webhook
+from workers import serve_multiprocess
 
 # region Initial Setup
-nest_asyncio.apply()
 logging.basicConfig(level=logging.INFO)
 load_dotenv()
 
@@ -45,18 +56,208 @@ ENV_VARS = {
 if not ENV_VARS["TOKEN"]:
     raise ValueError("Missing Telegram token in .env")
 
-# Reddit Client Setup
-reddit = praw.Reddit(
-    client_id=ENV_VARS["REDDIT_CLIENT_ID"],
-    client_secret=ENV_VARS["REDDIT_CLIENT_SECRET"],
-    username=ENV_VARS["REDDIT_USERNAME"],
-    password=ENV_VARS["REDDIT_PASSWORD"],
-    user_agent="telegram_reddit_bot"
-)
+# Upstream endpoints (overridable for local fakes in the load-test benchmark)
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
+DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1").rstrip("/")
+OPENROUTER_CHAT_URL = f"{OPENROUTER_BASE_URL}/chat/completions"
+DEEPSEEK_ASK_URL = f"{DEEPSEEK_BASE_URL}/ask"
+REDDIT_URLS = {
+    key: os.getenv(env) for key, env in (("reddit_url", "REDDIT_URL"), ("oauth_url", "REDDIT_OAUTH_URL"))
+    if os.getenv(env)
+}
+
+# Feature libraries are imported on first use. PRELOAD_FEATURES (e.g. "reddit,stt")
+# warms them in the background after startup instead.
+FEATURE_MODULES = {
+    "reddit": ["praw"],
+    "stt": ["speech_recognition"],
+    "tts": ["gtts"],
+    "translate": ["argostranslate.translate", "argostranslate.package"],
+    "languages": ["googletrans"],
+}
+PRELOAD_FEATURES = [f.strip() for f in os.getenv("PRELOAD_FEATURES", "").split(",") if f.strip()]
+
+# Reddit Client Setup (built by the gateway on the first Reddit call)
+def make_reddit():
+    import praw
+    return praw.Reddit(
+        client_id=ENV_VARS["REDDIT_CLIENT_ID"],
+        client_secret=ENV_VARS["REDDIT_CLIENT_SECRET"],
+        username=ENV_VARS["REDDIT_USERNAME"],
+        password=ENV_VARS["REDDIT_PASSWORD"],
+        user_agent="telegram_reddit_bot",
+        check_for_async=False,  # every call runs on RedditGateway's thread pool
+        **REDDIT_URLS
+    )
+
+reddit_io = RedditGateway(make_reddit, max_workers=int(os.getenv("REDDIT_WORKERS", "4")))
+loop_monitor = LoopLagMonitor(report_every=float(os.getenv("LOOP_LAG_REPORT_INTERVAL", "300")))
 
 # Global Constants
 COMMENT_INTERVAL = 1200  # 20 minutes in seconds
+COMMENT_JITTER = float(os.getenv("AUTO_COMMENT_JITTER", "60"))
+MIN_COMMENT_INTERVAL = float(os.getenv("AUTO_COMMENT_MIN_MINUTES", "5")) * 60
+seen_posts = SeenPostIndex(
+    os.getenv("SEEN_POSTS_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "seen_posts.db")),
+    max_per_subreddit=int(os.getenv("SEEN_POSTS_PER_SUB", "1000"))
+)
 timestamp_last_comment = 0
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "1") == "1"
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))  # Telegram edit throttle
+MISTRAL_MODEL = "mistralai/mistral-7b-instruct"
+
+# Upstream AI resilience: per-provider circuit breakers, a retry budget with backoff, deadlines
+resilience = Resilience(
+    deadline=float(os.getenv("LLM_DEADLINE", "30")),
+    max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", "3")),
+    failure_rate=float(os.getenv("BREAKER_FAILURE_RATE", "0.5")),
+    min_calls=int(os.getenv("BREAKER_MIN_CALLS", "5")),
+    open_for=float(os.getenv("BREAKER_OPEN_SECONDS", "30")),
+    retry_ratio=float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+)
+LLM_STREAM_DEADLINE = float(os.getenv("LLM_STREAM_DEADLINE", "120"))  # streamed answers run longer
+
+# LLM response cache (set LLM_CACHE_DB to keep entries across restarts)
+llm_cache = ResponseCache(
+    max_entries=int(os.getenv("LLM_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+    disk_path=os.getenv("LLM_CACHE_DB") or None,
+    max_disk_entries=int(os.getenv("LLM_CACHE_DB_SIZE", "10000"))
+)
+
+# Argos inference pool; each worker preloads TRANSLATION_PAIRS (e.g. "en:fa,fa:en")
+translator = TranslationPool(
+    workers=int(os.getenv("TRANSLATION_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    pairs=parse_pairs(os.getenv("TRANSLATION_PAIRS")),
+    max_queue=int(os.getenv("TRANSLATION_QUEUE", "32")),
+    timeout=float(os.getenv("TRANSLATION_TIMEOUT", "60"))
+)
+# Voice decoding (ffmpeg processes) and recognition (threads)
+voice_pipeline = VoicePipeline(
+    ffmpeg=os.getenv("FFMPEG_PATH", "ffmpeg"),
+    max_duration=float(os.getenv("VOICE_MAX_SECONDS", "120")),
+    max_bytes=int(os.getenv("VOICE_MAX_BYTES", str(5 * 1024 * 1024))),
+    decode_concurrency=int(os.getenv("VOICE_DECODE_WORKERS", "2")),
+    recognize_workers=int(os.getenv("VOICE_RECOGNIZE_WORKERS", "4"))
+)
+
+# Speech-to-text backends; /voice picks by name, "auto" (latency) or "local"
+speech_backends = SpeechBackends(default=os.getenv("STT_DEFAULT_BACKEND", "google"))
+speech_backends.register(GoogleBackend(voice_pipeline))
+speech_backends.register(OpenRouterBackend(
+    lambda: http.session, ENV_VARS["OPENROUTER_API_KEY"], url=f"{OPENROUTER_BASE_URL}/voice-to-text"
+))
+if os.getenv("VOSK_MODEL_PATH"):
+    speech_backends.register(VoskBackend(voice_pipeline, os.getenv("VOSK_MODEL_PATH")))
+if os.getenv("STT_ENABLE_STUB") == "1":
+    speech_backends.register(StubBackend())
+VOICE_CHUNK_SIZE = int(os.getenv("VOICE_CHUNK_KB", "64")) * 1024
+
+# gTTS output cache: audio on disk (LRU by size) + Telegram file_id reuse
+tts_cache = TTSCache(
+    os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache")),
+    max_bytes=int(os.getenv("TTS_CACHE_MAX_MB", "200")) * 1024 * 1024
+)
+synthesizer = ChunkedSynthesizer(
+    max_concurrency=int(os.getenv("TTS_CONCURRENCY", "4")),
+    chunk_chars=int(os.getenv("TTS_CHUNK_CHARS", "200")),
+    pipeline=voice_pipeline
+)
+
+# Admission control: per-user token buckets + per-upstream concurrency gates
+admission = AdmissionController(
+    rate_per_minute=float(os.getenv("RATE_LIMIT_PER_MIN", "6")),
+    burst=float(os.getenv("RATE_LIMIT_BURST", "3")),
+    upstream_limits=parse_limits(os.getenv("UPSTREAM_LIMITS", "openrouter:8,deepseek:4,argos:4,stt:4,gtts:4")),
+    max_waiting=int(os.getenv("ADMISSION_QUEUE", "20")),
+    max_wait=float(os.getenv("ADMISSION_MAX_WAIT", "30"))
+)
+
+# Latency histograms, error counters and in-flight gauges per command and upstream
+metrics = Metrics()
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))  # 0 disables the endpoint
+metrics_server = MetricsServer(metrics, host=os.getenv("METRICS_HOST", "127.0.0.1"), port=METRICS_PORT)
+
+# Polled updates run concurrently across chats (in order within a chat) up to this limit
+CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "64"))
+update_processor = ChatOrderedUpdateProcessor(CONCURRENT_UPDATES)
+
+def collect_admission(registry: Metrics) -> None:
+    """Copy admission queue state and concurrent update count into the metrics"""
+    gates = admission.stats()
+    for name, gate in gates["queues"].items():
+        registry.set("bot_admission_in_flight", gate["in_flight"], upstream=name)
+        registry.set("bot_admission_waiting", gate["waiting"], upstream=name)
+    for command, count in gates["admitted"].items():
+        registry.set_total("bot_admission_admitted_total", count, command=command)
+    for reason, count in gates["rejected"].items():
+        registry.set_total("bot_admission_rejected_total", count, reason=reason)
+    registry.set("bot_updates_in_flight", update_processor.current_concurrent_updates)
+
+metrics.collect(collect_admission)
+
+# Per-update span traces for /debug_slow and a sampling profiler for /debug_profile
+tracer = Tracer(capacity=int(os.getenv("TRACE_BUFFER", "500")))
+profiler = SamplingProfiler(interval=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000)
+ADMIN_IDS = {int(i) for i in os.getenv("ADMIN_IDS", "").split(",") if i.strip()}
+
+@asynccontextmanager
+async def upstream_call(name: str):
+    """Record an upstream call in the metrics and the current trace"""
+    with span(f"upstream.{name}"):
+        async with metrics.upstream(name):
+            yield
+
+# Routed chat (CHAT_ROUTING=1): /chat goes to the fastest healthy route in CHAT_ROUTES
+# and is hedged onto the next route when it runs past that route's recent HEDGE_QUANTILE
+CHAT_ROUTING = os.getenv("CHAT_ROUTING", "0") == "1"
+chat_router = Router(
+    parse_routes(os.getenv("CHAT_ROUTES", f"openrouter:{MISTRAL_MODEL},deepseek")),
+    resilience,
+    hedge_quantile=float(os.getenv("HEDGE_QUANTILE", "0.95")),
+    hedge_delay=float(os.getenv("HEDGE_DELAY", "2.0")),
+    hedge_ratio=float(os.getenv("HEDGE_BUDGET_RATIO", "0.1")),
+    metrics=metrics
+)
+if unknown := {r.provider for r in chat_router.routes} - {"openrouter", "deepseek"}:
+    raise ValueError(f"Unknown CHAT_ROUTES provider(s): {', '.join(sorted(unknown))}")
+
+packages = PackageManager(index_ttl=float(os.getenv("ARGOS_INDEX_TTL", "86400")))
+translation_batcher = TranslationBatcher(
+    translator,
+    max_batch=int(os.getenv("TRANSLATION_BATCH_SIZE", "8")),
+    max_wait=float(os.getenv("TRANSLATION_BATCH_WAIT_MS", "20")) / 1000
+)
+
+# Serving mode: "polling" (default) or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# More than one process: an ingress process shards updates by chat onto N bot workers
+BOT_PROCESSES = int(os.getenv("BOT_PROCESSES", "1"))
+BOT_QUEUE_SIZE = int(os.getenv("BOT_QUEUE_SIZE", "1000"))
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL") or None  # e.g. a local Bot API server
+TELEGRAM_FILE_URL = os.getenv("TELEGRAM_FILE_URL") or None  # its file download base
+BOT_LOOP = os.getenv("BOT_LOOP", "asyncio").lower()  # "asyncio" or "uvloop"
+WEBHOOK = WebhookSettings(
+    url=os.getenv("WEBHOOK_URL") or None,
+    listen=os.getenv("WEBHOOK_LISTEN", "0.0.0.0"),
+    port=int(os.getenv("WEBHOOK_PORT", "8443")),
+    path=os.getenv("WEBHOOK_PATH", "/telegram"),
+    secret_token=os.getenv("WEBHOOK_SECRET") or None,
+    workers=int(os.getenv("WEBHOOK_WORKERS", "4")),
+    queue_size=int(os.getenv("WEBHOOK_QUEUE", "1000")),
+    max_connections=int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+)
+
+# Shared HTTP pool (opened in post_init, closed in post_shutdown)
+http = HttpClient(HttpSettings(
+    total_timeout=float(os.getenv("HTTP_TOTAL_TIMEOUT", "60")),
+    connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "10")),
+    read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", "45")),
+    limit=int(os.getenv("HTTP_POOL_LIMIT", "100")),
+    limit_per_host=int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20")),
+    dns_ttl=int(os.getenv("HTTP_DNS_TTL", "300")),
+    keepalive_timeout=float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+))
 # endregion
 
 # region Core Bot Functions
@@ -70,14 +271,19 @@ async def command_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         "/start - Initialize bot",
         "/post [sub] [title] [content] - Reddit post",
         "/comment [sub] - Comment on latest post",
-        "/auto_comment [sub] - Auto-comment every 20min",
-        "/voice - Speech-to-text (Google)",
-        "/voice_openrouter - Speech-to-text (AI)",
+        "/auto_comment [sub] [minutes] - Auto-comment (default 20min)",
+        "/auto_comment_list - Show auto-comment jobs",
+        "/auto_comment_stop [sub] - Stop auto-commenting",
+        "/voice [backend|auto|local] - Speech-to-text (reply to a voice message; plain ones use Google)",
+        "/voice_backends - Speech backends and latency",
+        "/voice_openrouter - Speech-to-text (AI, reply to a voice message)",
         "/text_to_voice [lang] [text] - Generate audio",
         "/deepseek [query] - DeepSeek AI chat",
         "/chat [query] - Mistral AI chat",
+        "/cache_stats - LLM cache hit rate",
         "/translate [src] [dest] [text] - Translate text",
         "/languages - Show language codes",
+        "/stats - Performance statistics",
         "/commands - Display this panel",
         "🔗 [Sticker](https://t.me/addstickers/Flatericamsh)",
         "📸 [Instagram](https://www.instagram.com/am_.shi)",
@@ -88,6 +294,85 @@ async def command_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         "✉️ ProtonMail: mrhflateric@proton.me"
     ]
     await update.message.reply_text("\n".join(commands), parse_mode="Markdown")
+
+async def bot_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show runtime performance statistics"""
+    lag = loop_monitor.snapshot()
+    batching = translation_batcher.stats()
+    tts = tts_cache.stats()
+    gates = admission.stats()
+    lines = [
+        f"⏱ Event loop: max block {lag['max_lag'] * 1000:.0f}ms, avg {lag['avg_lag'] * 1000:.1f}ms",
+        f"🌍 Translation batches: {batching['batches']} for {batching['requests']} requests, "
+        f"avg size {batching['avg_batch']:.1f} (max {batching['largest_batch']}), "
+        f"avg wait {batching['avg_wait_ms']:.1f}ms, queued {translator.pending}",
+        f"🔈 TTS cache: {tts['file_id_hits']} file_id hits, {tts['disk_hits']} disk hits, {tts['misses']} misses, "
+        f"{tts['files']} files / {tts['bytes'] // 1024}KB",
+        "🚦 Upstreams: " + ", ".join(
+            f"{name} {q['in_flight']}/{q['limit']} (+{q['waiting']} queued)" for name, q in gates["queues"].items()
+        ),
+        "⛔ Rejected: " + (", ".join(f"{k} {v}" for k, v in gates["rejected"].items()) or "none"),
+        "🔌 Circuits: " + (", ".join(
+            f"{name} {c['state']} ({c['failure_rate']:.0%} failing, {c['retries']} retries, "
+            f"{c['timeouts']} timeouts, {c['trips']} trips)"
+            for name, c in resilience.stats().items()
+        ) or "no calls yet"),
+        "📈 p99 by command: " + (", ".join(
+            f"/{dict(labels)['command']} ≤{h.quantile(0.99):g}s ({h.count})"
+            for labels, h in sorted(metrics.histograms.get("bot_handler_duration_seconds", {}).items())
+        ) or "no samples"),
+    ]
+    if CHAT_ROUTING:
+        routing = chat_router.stats()
+        lines.append(
+            f"🧭 Routes: {routing['requests']} routed, {routing['hedged']} hedged "
+            f"({routing['hedge_wins']} hedge wins), {routing['failovers']} failovers; " + ", ".join(
+                f"{name} {r['ewma'] * 1000:.0f}ms ewma / {r['p95'] * 1000:.0f}ms p95"
+                if r["ewma"] is not None else f"{name} unmeasured"
+                for name, r in routing["routes"].items()
+            )
+        )
+    await update.message.reply_text("📊 Bot stats:\n" + "\n".join(lines))
+
+def is_admin(update: Update) -> bool:
+    return bool(update.effective_user) and update.effective_user.id in ADMIN_IDS
+
+async def debug_slow(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show the slowest recent updates with their span breakdown (admins only)"""
+    if not is_admin(update):
+        await update.message.reply_text("⛔ Admins only")
+        return
+    count = int(context.args[0]) if context.args and context.args[0].isdigit() else 5
+    slowest = tracer.slowest(count)
+    if not slowest:
+        await update.message.reply_text("🐌 No traced updates yet")
+        return
+    blocks = []
+    for rank, (finished_at, root) in enumerate(slowest, 1):
+        attrs = root.attrs
+        header = (f"#{rank} update {attrs['update_id']} chat {attrs['chat_id']}, "
+                  f"{(time.time() - finished_at) / 60:.0f}min ago")
+        blocks.append(header + "\n" + "\n".join(root.format(min_duration=0.005)))
+    await update.message.reply_text(("🐌 Slowest recent updates:\n\n" + "\n\n".join(blocks))[:4096])
+
+async def debug_profile(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Toggle the event loop sampling profiler: /debug_profile on|off (admins only)"""
+    if not is_admin(update):
+        await update.message.reply_text("⛔ Admins only")
+        return
+    action = context.args[0].lower() if context.args else ("off" if profiler.running else "on")
+    if action == "on":
+        profiler.start()
+        await update.message.reply_text(f"🔬 Profiler on, sampling every {profiler.interval * 1000:.0f}ms")
+    elif action == "off":
+        profiler.stop()
+        report = profiler.report()
+        await update.message.reply_text(
+            (f"🔬 Profiler off, {profiler.samples} samples:\n" + "\n".join(report))[:4096]
+            if report else "🔬 Profiler off, no samples"
+        )
+    else:
+        await update.message.reply_text("❌ Format: /debug_profile [on|off]")
 # endregion
 
 # region Reddit Integration
@@ -99,8 +384,9 @@ async def reddit_post_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
     
     try:
-        submission = reddit.subreddit(args[0]).submit(args[1], selftext=" ".join(args[2:]))
-        await update.message.reply_text(f"✅ Posted: {submission.url}")
+        async with upstream_call("reddit"):
+            url = await reddit_io.submit(args[0], args[1], " ".join(args[2:]))
+        await update.message.reply_text(f"✅ Posted: {url}")
     except Exception as e:
         await update.message.reply_text(f"❌ Post failed: {str(e)}")
 
@@ -110,45 +396,106 @@ async def generate_comment(title: str, content: str) -> Optional[str]:
         "Authorization": f"Bearer {ENV_VARS['OPENROUTER_API_KEY']}",
         "Content-Type": "application/json"
     }
-    payload = {
-        "model": "mistralai/mistral-7b-instruct",
-        "messages": [
-            {"role": "system", "content": "Generate relevant Reddit comment"},
-            {"role": "user", "content": f"Post: {title}\n{content}"}
-        ]
-    }
+    messages = [
+        {"role": "system", "content": "Generate relevant Reddit comment"},
+        {"role": "user", "content": f"Post: {title}\n{content}"}
+    ]
+    payload = {"model": MISTRAL_MODEL, "messages": messages}
+    
+    async def attempt() -> str:
+        async with http.session.post(OPENROUTER_CHAT_URL, headers=headers, json=payload) as response:
+            response.raise_for_status()
+            data = await response.json()
+            return data['choices'][0]['message']['content']
+    
+    async def fetch() -> str:
+        async with upstream_call("openrouter"):
+            return await resilience.call("openrouter", attempt)
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post("https://openrouter.ai/api/v1/chat/completions", 
-                                  headers=headers, json=payload) as response:
-                data = await response.json()
-                return data['choices'][0]['message']['content']
+        comment, _ = await llm_cache.get_or_fetch(llm_cache.key("openrouter", MISTRAL_MODEL, messages), fetch)
+        return comment
     except Exception as e:
         logging.error(f"Comment generation failed: {str(e)}")
         return None
 
-async def auto_comment_task(subreddit: str) -> None:
-    """Automatic commenting background task"""
-    while True:
-        try:
-            post = next(reddit.subreddit(subreddit).new(limit=1))
-            if comment := await generate_comment(post.title, post.selftext):
-                post.reply(comment)
-                logging.info(f"💬 Commented on {post.id}")
-        except Exception as e:
-            logging.error(f"Auto-comment error: {str(e)}")
-        await asyncio.sleep(COMMENT_INTERVAL)
+async def comment_on_post(subreddit: str, post) -> None:
+    """Generate and post a comment on a single submission"""
+    if seen_posts.seen(subreddit, post.id):
+        logging.info(f"⏭ Already handled {post.id} in r/{subreddit}")
+        return
+    if comment := await generate_comment(post.title, post.selftext):
+        async with upstream_call("reddit"):
+            await reddit_io.reply(post, comment)
+        seen_posts.add(subreddit, post.id)
+        logging.info(f"💬 Commented on {post.id} in r/{subreddit}")
+
+async def auto_comment_cycle(subreddits: list) -> dict:
+    """Serve every due subreddit from one coalesced Reddit poll"""
+    errors = {}
+    async with upstream_call("reddit"):
+        latest = await reddit_io.latest_posts(subreddits)
+    results = await asyncio.gather(
+        *(comment_on_post(sub, post) for sub, post in latest.items()),
+        return_exceptions=True
+    )
+    for sub, result in zip(latest, results):
+        if isinstance(result, Exception):
+            logging.error(f"Auto-comment error in r/{sub}: {str(result)}")
+            errors[sub] = str(result)
+    return errors
+
+auto_comments = AutoCommentScheduler(auto_comment_cycle)
 
 async def start_auto_comment(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Enable automatic commenting"""
     if not context.args:
-        await update.message.reply_text("❌ Format: /auto_comment subreddit")
+        await update.message.reply_text("❌ Format: /auto_comment subreddit [minutes]")
+        return
+    
+    subreddit = context.args[0]
+    try:
+        interval = float(context.args[1]) * 60 if len(context.args) > 1 else COMMENT_INTERVAL
+    except ValueError:
+        await update.message.reply_text("❌ Interval must be a number of minutes")
+        return
+    if not interval >= MIN_COMMENT_INTERVAL:  # also rejects "nan"
+        await update.message.reply_text(f"❌ Interval must be at least {MIN_COMMENT_INTERVAL / 60:g} minutes")
+        return
+    
+    if auto_comments.add(subreddit, interval, jitter=min(COMMENT_JITTER, interval / 4)):
+        await update.message.reply_text(f"🔄 Auto-commenting started in r/{subreddit}")
+    else:
+        await update.message.reply_text(f"🔁 r/{subreddit} already scheduled, interval updated")
+
+async def list_auto_comments(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """List scheduled auto-comment jobs"""
+    jobs = auto_comments.jobs()
+    if not jobs:
+        await update.message.reply_text("📭 No auto-comment jobs")
+        return
+    
+    now = time.monotonic()
+    lines = [
+        f"r/{job.subreddit}: every {job.interval / 60:.0f}min, next in {max(0, job.next_run - now) / 60:.1f}min, "
+        f"runs {job.runs}" + (f", last error: {job.last_error}" if job.last_error else "")
+        for job in jobs
+    ]
+    stats = seen_posts.stats()
+    lines.append(f"👁 Seen-post index: {stats['hits']} hits / {stats['misses']} misses")
+    await update.message.reply_text("🗓 Auto-comment jobs:\n" + "\n".join(lines))
+
+async def stop_auto_comment(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Disable automatic commenting for a subreddit"""
+    if not context.args:
+        await update.message.reply_text("❌ Format: /auto_comment_stop subreddit")
         return
     
     subreddit = context.args[0]
-    asyncio.create_task(auto_comment_task(subreddit))
-    await update.message.reply_text(f"🔄 Auto-commenting started in r/{subreddit}")
+    if auto_comments.remove(subreddit):
+        await update.message.reply_text(f"⏹ Auto-commenting stopped in r/{subreddit}")
+    else:
+        await update.message.reply_text(f"❌ r/{subreddit} is not scheduled")
 # endregion
 
 # region AI Services
@@ -159,17 +506,55 @@ async def deepseek_query(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
     
     headers = {"Authorization": f"Bearer {ENV_VARS['DEEPSEEK_API_KEY']}"}
-    payload = {"question": " ".join(context.args)}
+    question = " ".join(context.args)
+    payload = {"question": question}
+    
+    async def attempt() -> Optional[str]:
+        if STREAM_REPLIES:
+            return await stream_reply(http.session, DEEPSEEK_ASK_URL, headers, payload,
+                                      update.message, "/deepseek", STREAM_EDIT_INTERVAL)
+        async with http.session.post(DEEPSEEK_ASK_URL, 
+                                     headers=headers, json=payload) as response:
+            response.raise_for_status()
+            data = await response.json()
+            return data.get("answer")
+    
+    async def fetch() -> Optional[str]:
+        async with upstream_call("deepseek"):
+            return await resilience.call("deepseek", attempt, LLM_STREAM_DEADLINE if STREAM_REPLIES else None)
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post("https://api.deepseek.com/v1/ask", 
-                                  headers=headers, json=payload) as response:
-                data = await response.json()
-                await update.message.reply_text(data.get("answer", "⚠️ No response"))
+        key = llm_cache.key("deepseek", "ask", [{"role": "user", "content": question}])
+        answer, source = await llm_cache.get_or_fetch(key, fetch)
+        if source != "fetched" or not STREAM_REPLIES:
+            await update.message.reply_text(answer or "⚠️ No response")
+    except CircuitOpen as e:
+        await update.message.reply_text(f"🔌 {str(e)}")
+    except DeadlineExceeded:
+        await update.message.reply_text("⌛ DeepSeek did not answer in time")
     except Exception as e:
         await update.message.reply_text(f"❌ API Error: {str(e)}")
 
+async def send_routed(route: Route, messages: list) -> str:
+    """One non-streamed chat completion on a routed provider"""
+    if route.provider == "deepseek":
+        url, payload = DEEPSEEK_ASK_URL, {"question": messages[-1]["content"]}
+        headers = {"Authorization": f"Bearer {ENV_VARS['DEEPSEEK_API_KEY']}"}
+    else:
+        url, payload = OPENROUTER_CHAT_URL, {"model": route.model or MISTRAL_MODEL, "messages": messages}
+        headers = {"Authorization": f"Bearer {ENV_VARS['OPENROUTER_API_KEY']}"}
+    
+    async def attempt() -> str:
+        async with http.session.post(url, headers=headers, json=payload) as response:
+            response.raise_for_status()
+            data = await response.json()
+            if route.provider == "deepseek":
+                return data.get("answer")
+            return data['choices'][0]['message']['content']
+    
+    async with upstream_call(route.provider):
+        return await resilience.call(route.provider, attempt)
+
 async def mistral_chat(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle Mistral AI chat requests"""
     if not context.args:
@@ -180,64 +565,96 @@ async def mistral_chat(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "Authorization": f"Bearer {ENV_VARS['OPENROUTER_API_KEY']}",
         "Content-Type": "application/json"
     }
-    payload = {
-        "model": "mistralai/mistral-7b-instruct",
-        "messages": [{"role": "user", "content": " ".join(context.args)}]
-    }
+    messages = [{"role": "user", "content": " ".join(context.args)}]
+    payload = {"model": MISTRAL_MODEL, "messages": messages}
+    
+    async def attempt() -> str:
+        if STREAM_REPLIES:
+            return await stream_reply(http.session, OPENROUTER_CHAT_URL, headers, payload,
+                                      update.message, "/chat", STREAM_EDIT_INTERVAL)
+        async with http.session.post(OPENROUTER_CHAT_URL, 
+                                     headers=headers, json=payload) as response:
+            response.raise_for_status()
+            data = await response.json()
+            return data['choices'][0]['message']['content']
+    
+    async def fetch() -> str:
+        if CHAT_ROUTING:
+            # Hedged requests cannot share one streamed message, so routed replies arrive whole
+            reply, _ = await chat_router.call(lambda route: send_routed(route, messages))
+            return reply
+        async with upstream_call("openrouter"):
+            return await resilience.call("openrouter", attempt, LLM_STREAM_DEADLINE if STREAM_REPLIES else None)
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post("https://openrouter.ai/api/v1/chat/completions", 
-                                  headers=headers, json=payload) as response:
-                data = await response.json()
-                reply = data['choices'][0]['message']['content']
-                await update.message.reply_text(reply)
+        key = llm_cache.key("routed", "chat", messages) if CHAT_ROUTING else llm_cache.key("openrouter", MISTRAL_MODEL, messages)
+        reply, source = await llm_cache.get_or_fetch(key, fetch)
+        if source != "fetched" or not STREAM_REPLIES or CHAT_ROUTING:
+            await update.message.reply_text(reply or "⚠️ No response")
+    except CircuitOpen as e:
+        await update.message.reply_text(f"🔌 {str(e)}")
+    except DeadlineExceeded:
+        await update.message.reply_text("⌛ The chat model did not answer in time")
     except Exception as e:
         await update.message.reply_text(f"❌ Chat error: {str(e)}")
+
+async def cache_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show LLM response cache statistics"""
+    stats = llm_cache.stats()
+    await update.message.reply_text(
+        f"🗃 LLM cache: {stats['size']} entries, hit rate {stats['hit_rate']:.0%}\n"
+        f"hits {stats['hits']} (disk {stats['disk_hits']}), shared {stats['coalesced']}, misses {stats['misses']}"
+    )
 # endregion
 
 # region Conversion Services
-async def google_voice_to_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Convert voice messages using Google's API"""
-    if not update.message.voice:
-        await update.message.reply_text("❌ Send a voice message")
+async def transcribe_voice(update: Update, backend_name: Optional[str], prefix: str) -> None:
+    """Transcribe the voice note sent, or replied to, with the chosen speech backend"""
+    replied = update.message.reply_to_message
+    voice = update.message.voice or (replied.voice if replied else None)
+    if not voice:
+        await update.message.reply_text("❌ Send a voice message, or reply to one with this command")
         return
     
     try:
-        voice_file = await update.message.voice.get_file()
-        recognizer = sr.Recognizer()
-        
-        with BytesIO() as buffer:
-            await voice_file.download(out=buffer)
-            buffer.seek(0)
-            
-            with sr.AudioFile(buffer) as source:
-                audio = await context.bot.run_async(recognizer.record, source)
-                text = recognizer.recognize_google(audio)
-                await update.message.reply_text(f"🔊 Transcription: {text}")
+        backend = speech_backends.choose(backend_name)
+        voice_pipeline.check_limits(voice.duration, voice.file_size)
+        voice_file = await voice.get_file()
+        voice_input = VoiceInput(
+            voice_file.download_as_bytearray, voice.duration, voice.file_size,
+            chunks=lambda: telegram_file_chunks(http.session, voice_file.file_path, VOICE_CHUNK_SIZE),
+            chunk_size=VOICE_CHUNK_SIZE
+        )
+        async with upstream_call(f"stt_{backend.name}"):
+            text = await backend.transcribe(voice_input)
+        await update.message.reply_text(f"{prefix} Transcription: {text}")
+    except KeyError as e:
+        await update.message.reply_text(f"❌ {e.args[0]}")
+    except AudioTooLong as e:
+        await update.message.reply_text(f"❌ Voice message too long: {str(e)}")
+    except NotUnderstood:
+        await update.message.reply_text("🤷 Could not understand the audio")
     except Exception as e:
         await update.message.reply_text(f"❌ Conversion error: {str(e)}")
 
+async def google_voice_to_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Convert voice messages (Google by default, or /voice backend|auto|local)"""
+    await transcribe_voice(update, context.args[0] if context.args else None, "🔊")
+
 async def openrouter_voice_to_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Convert voice using OpenRouter's API"""
-    if not update.message.voice:
-        await update.message.reply_text("❌ Send a voice message")
-        return
-    
-    try:
-        voice_file = await update.message.voice.get_file()
-        headers = {"Authorization": f"Bearer {ENV_VARS['OPENROUTER_API_KEY']}"}
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://openrouter.ai/api/v1/voice-to-text",
-                headers=headers,
-                data={"file": await voice_file.download_as_bytearray()}
-            ) as response:
-                data = await response.json()
-                await update.message.reply_text(f"🤖 Transcription: {data.get('text', '⚠️ Error')}")
-    except Exception as e:
-        await update.message.reply_text(f"❌ AI processing failed: {str(e)}")
+    await transcribe_voice(update, "openrouter", "🤖")
+
+async def list_voice_backends(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show registered speech backends and their recent latency"""
+    lines = [
+        f"{backend.name}{' (default)' if backend.name == speech_backends.default else ''}: "
+        + (f"{backend.latency:.2f}s avg" if backend.latency is not None else "no samples")
+        + f", {backend.calls} ok / {backend.failures} failed"
+        + ("" if backend.needs_network else ", offline")
+        for backend in speech_backends.all()
+    ]
+    await update.message.reply_text("🎙 Speech backends:\n" + "\n".join(lines))
 
 async def text_to_speech(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Convert text to audio using gTTS"""
@@ -246,12 +663,24 @@ async def text_to_speech(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
     
     lang, text = context.args[0], " ".join(context.args[1:])
+    key = tts_cache.key(lang, text)
     try:
-        tts = gTTS(text, lang=lang)
-        with BytesIO() as audio_buffer:
-            tts.write_to_fp(audio_buffer)
-            audio_buffer.seek(0)
-            await update.message.reply_voice(voice=audio_buffer)
+        if file_id := tts_cache.get_file_id(key):
+            try:
+                await update.message.reply_voice(voice=file_id)
+                return
+            except BadRequest:
+                tts_cache.set_file_id(key, None)  # stale file_id, fall back to audio
+        
+        audio = tts_cache.get_audio(key)
+        if audio is None:
+            async with upstream_call("gtts"):
+                audio = await synthesizer.synthesize(lang, text)
+            tts_cache.put_audio(key, audio)
+        
+        sent = await update.message.reply_voice(voice=audio)
+        if sent.voice:
+            tts_cache.set_file_id(key, sent.voice.file_id)
     except Exception as e:
         await update.message.reply_text(f"❌ Synthesis error: {str(e)}")
 # endregion
@@ -266,13 +695,13 @@ async def install_language(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     src, dest = context.args[0], context.args[1]
     
     try:
-        argostranslate.package.update_package_index()
-        available_packages = argostranslate.package.get_available_packages()
-        package_to_install = next((pkg for pkg in available_packages if pkg.from_code == src and pkg.to_code == dest), None)
-        
-        if package_to_install:
-            argostranslate.package.install_from_path(package_to_install.download())
+        async with upstream_call("argos_install"):
+            result = await packages.install(src, dest)
+        if result == "installed":
+            translator.invalidate()
             await update.message.reply_text(f"✅ Language package for {src} to {dest} installed successfully.")
+        elif result == "present":
+            await update.message.reply_text(f"✅ Language package for {src} to {dest} is already installed.")
         else:
             await update.message.reply_text(f"❌ No language package found for {src} to {dest}.")
     except Exception as e:
@@ -287,25 +716,28 @@ async def translate_text(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     src, dest, text = context.args[0], context.args[1], " ".join(context.args[2:])
     
     try:
-        # Ensure the specific language package is installed
-        await install_language(update, context)
-        
-        # Translate text
-        installed_languages = argostranslate.translate.get_installed_languages()
-        from_lang = next((lang for lang in installed_languages if lang.code == src), None)
-        to_lang = next((lang for lang in installed_languages if lang.code == dest), None)
+        async with upstream_call("argos"):
+            translated_text = await translation_batcher.translate(src, dest, text)
+        if translated_text is None:
+            # Only install when the pair is missing; cached pairs skip setup entirely
+            await install_language(update, context)
+            async with upstream_call("argos"):
+                translated_text = await translation_batcher.translate(src, dest, text)
         
-        if from_lang and to_lang:
-            translation = from_lang.get_translation(to_lang)
-            translated_text = translation.translate(text)
+        if translated_text is not None:
             await update.message.reply_text(f"🌍 {translated_text}")
         else:
             await update.message.reply_text("❌ Translation failed: Language not installed")
+    except TranslationBusy:
+        await update.message.reply_text("⏳ Translator is busy, please try again shortly")
+    except asyncio.TimeoutError:
+        await update.message.reply_text("⌛ Translation timed out")
     except Exception as e:
         await update.message.reply_text(f"❌ Translation failed: {str(e)}")
 
 async def show_language_codes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Display supported language codes"""
+    from googletrans import LANGUAGES
     languages = "\n".join([f"{code}: {name}" for code, name in LANGUAGES.items()])
     await update.message.reply_text(f"🗣 Supported Languages:\n{languages}")
 # endregion
@@ -316,46 +748,137 @@ async def configure_bot_commands(application: Application) -> None:
     commands = [
         BotCommand("start", "Initialize bot"),
         BotCommand("commands", "Show all features"),
+        BotCommand("stats", "Performance statistics"),
         BotCommand("post", "Create Reddit post"),
         BotCommand("comment", "Comment on post"),
         BotCommand("auto_comment", "Auto-comment system"),
+        BotCommand("auto_comment_list", "List auto-comment jobs"),
+        BotCommand("auto_comment_stop", "Stop auto-commenting"),
         BotCommand("voice", "Voice-to-text (Google)"),
         BotCommand("voice_openrouter", "Voice-to-text (AI)"),
+        BotCommand("voice_backends", "Speech backends"),
         BotCommand("text_to_voice", "Generate speech"),
         BotCommand("deepseek", "DeepSeek AI chat"),
         BotCommand("chat", "Mistral AI chat"),
+        BotCommand("cache_stats", "LLM cache statistics"),
         BotCommand("translate", "Translate text"),
         BotCommand("languages", "Language codes"),
         BotCommand("install_language", "Install language package")
     ]
     await application.bot.set_my_commands(commands)
 
-async def main() -> None:
-    """Main application entry point"""
-    application = Application.builder().token(ENV_VARS["TOKEN"]).build()
+async def preload_features(features: list) -> None:
+    """Import feature libraries off the event loop so first use is fast"""
+    for feature in features:
+        if feature not in FEATURE_MODULES:
+            logging.warning(f"Unknown feature '{feature}' in PRELOAD_FEATURES")
+            continue
+        started = time.perf_counter()
+        try:
+            for module in FEATURE_MODULES[feature]:
+                await asyncio.to_thread(importlib.import_module, module)
+        except ImportError as e:
+            logging.warning(f"Could not preload {feature}: {str(e)}")
+            continue
+        logging.info(f"📦 Preloaded {feature} in {time.perf_counter() - started:.2f}s")
+
+async def on_startup(application: Application) -> None:
+    """Open shared resources once the application is initialized"""
+    await http.start()
+    await configure_bot_commands(application)
+    loop_monitor.start()
+    auto_comments.start()
+    translator.start()
+    for backend in speech_backends.all():
+        if isinstance(backend, VoskBackend):
+            backend.start()
+    if PRELOAD_FEATURES:
+        application.create_task(preload_features(PRELOAD_FEATURES))
+    if METRICS_PORT:
+        # Multi-process workers each expose their own endpoint on consecutive ports
+        metrics_server.port = METRICS_PORT + int(os.getenv("BOT_WORKER_INDEX", "0"))
+        await metrics_server.start()
+
+async def on_shutdown(application: Application) -> None:
+    """Release shared resources on shutdown"""
+    await auto_comments.stop()
+    await loop_monitor.stop()
+    await metrics_server.stop()
+    profiler.stop()
+    logging.info(f"⏱ Max event loop block this run: {loop_monitor.snapshot()['max_lag'] * 1000:.0f}ms")
+    reddit_io.shutdown()
+    speech_backends.shutdown()
+    synthesizer.shutdown()
+    voice_pipeline.shutdown()
+    translator.shutdown()
+    packages.shutdown()
+    seen_posts.close()
+    llm_cache.close()
+    tts_cache.close()
+    await http.close()
+
+def build_application() -> Application:
+    """Build the Application with all handlers registered"""
+    builder = (
+        Application.builder()
+        .token(ENV_VARS["TOKEN"])
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .concurrent_updates(update_processor)
+    )
+    builder = builder.request(TracedRequest())
+    if TELEGRAM_API_URL:
+        builder = builder.base_url(TELEGRAM_API_URL)
+    if TELEGRAM_FILE_URL:
+        builder = builder.base_file_url(TELEGRAM_FILE_URL)
+    application = builder.build()
     
     handlers = [
         CommandHandler("start", start),
         CommandHandler("commands", command_panel),
+        CommandHandler("stats", bot_stats),
         CommandHandler("post", reddit_post_command),
         CommandHandler("auto_comment", start_auto_comment),
-        CommandHandler("deepseek", deepseek_query),
-        CommandHandler("voice", google_voice_to_text),
-        CommandHandler("voice_openrouter", openrouter_voice_to_text),
-        CommandHandler("text_to_voice", text_to_speech),
-        CommandHandler("chat", mistral_chat),
-        CommandHandler("translate", translate_text),
+        CommandHandler("auto_comment_list", list_auto_comments),
+        CommandHandler("auto_comment_stop", stop_auto_comment),
+        CommandHandler("deepseek", admission.guard(deepseek_query, "deepseek", "deepseek")),
+        CommandHandler("voice", admission.guard(google_voice_to_text, "voice", "stt")),
+        CommandHandler("voice_openrouter", admission.guard(openrouter_voice_to_text, "voice_openrouter", "openrouter")),
+        CommandHandler("voice_backends", list_voice_backends),
+        CommandHandler("text_to_voice", admission.guard(text_to_speech, "text_to_voice", "gtts")),
+        CommandHandler("chat", admission.guard(mistral_chat, "chat", "openrouter")),
+        CommandHandler("cache_stats", cache_stats),
+        CommandHandler("translate", admission.guard(translate_text, "translate", "argos")),
         CommandHandler("languages", show_language_codes),
-        CommandHandler("install_language", install_language)
+        CommandHandler("install_language", install_language),
+        CommandHandler("debug_slow", debug_slow),
+        CommandHandler("debug_profile", debug_profile),
+        MessageHandler(filters.VOICE, admission.guard(google_voice_to_text, "voice", "stt"))
     ]
     
     for handler in handlers:
+        command = next(iter(handler.commands)) if isinstance(handler, CommandHandler) else "voice_message"
+        handler.callback = tracer.trace(metrics.instrument(handler.callback, command), f"/{command}")
         application.add_handler(handler)
+    return application
 
-    await configure_bot_commands(application)
-    logging.info("Bot is operational")
-    await application.run_polling()
+async def main() -> None:
+    """Main application entry point"""
+    if BOT_PROCESSES > 1:
+        logging.info(f"Bot is operational ({BOT_MODE} mode, {BOT_PROCESSES} processes)")
+        await serve_multiprocess(
+            ENV_VARS["TOKEN"], os.path.abspath(__file__), BOT_PROCESSES, BOT_MODE,
+            webhook=WEBHOOK, queue_size=BOT_QUEUE_SIZE, base_url=TELEGRAM_API_URL
+        )
+        return
+
+    application = build_application()
+    logging.info(f"Bot is operational ({BOT_MODE} mode)")
+    if BOT_MODE == "webhook":
+        await serve_webhook(application, WEBHOOK)
+    else:
+        await serve_polling(application)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main(), BOT_LOOP)
 # endregion
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""
+Admission control for expensive handlers.
+Each (user, command) pair has a token bucket, and each upstream has a
+concurrency limit with a bounded wait queue. Requests over the rate are
+rejected immediately, and so are requests that find the queue full.
+"""
+import asyncio
+import functools
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+class Rejected(Exception):
+    """Base class for admission rejections"""
+
+
+class RateLimited(Rejected):
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limited, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class Overloaded(Rejected):
+    """The upstream's wait queue is full or the wait timed out"""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        return max(0.0, (1 - self.tokens) / self.rate) if self.rate > 0 else float("inf")
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class UpstreamGate:
+    """Concurrency limit with a bounded, time-limited wait queue"""
+
+    def __init__(self, limit: int, max_waiting: int, max_wait: float):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked():
+            if self.waiting >= self.max_waiting:
+                raise Overloaded("queue full")
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                raise Overloaded("timed out waiting for a slot")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+
+class AdmissionController:
+    """Per-user/per-command rate limits plus per-upstream concurrency gates"""
+
+    def __init__(self, rate_per_minute: float = 6.0, burst: float = 3.0,
+                 upstream_limits: Optional[Dict[str, int]] = None,
+                 max_waiting: int = 20, max_wait: float = 30.0, max_buckets: int = 10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.max_buckets = max_buckets
+        self._buckets: Dict[Tuple[int, str], TokenBucket] = {}
+        self._gates: Dict[str, UpstreamGate] = {
+            name: UpstreamGate(limit, max_waiting, max_wait) for name, limit in (upstream_limits or {}).items()
+        }
+        self.admitted: Dict[str, int] = defaultdict(int)
+        self.rejected: Dict[str, int] = defaultdict(int)
+
+    def _bucket(self, user_id: int, command: str) -> TokenBucket:
+        key = (user_id, command)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                # Full buckets carry no state worth keeping
+                for stale in [k for k, b in self._buckets.items() if b.idle]:
+                    del self._buckets[stale]
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def gate(self, upstream: str) -> UpstreamGate:
+        if upstream not in self._gates:
+            self._gates[upstream] = UpstreamGate(8, self.max_waiting, self.max_wait)
+        return self._gates[upstream]
+
+    @asynccontextmanager
+    async def admit(self, user_id: int, command: str, upstream: str):
+        """Raise RateLimited/Overloaded, or hold an upstream slot for the block"""
+        bucket = self._bucket(user_id, command)
+        if not bucket.try_take():
+            self.rejected["rate_limited"] += 1
+            raise RateLimited(bucket.retry_after())
+        try:
+            async with self.gate(upstream).slot():
+                self.admitted[command] += 1
+                yield
+        except Overloaded:
+            self.rejected[f"overloaded:{upstream}"] += 1
+            raise
+
+    def guard(self, handler: Callable[..., Awaitable[None]], command: str, upstream: str):
+        """Wrap a Telegram handler so it runs only when admitted"""
+        @functools.wraps(handler)
+        async def wrapper(update, context):
+            user = update.effective_user
+            try:
+                async with self.admit(user.id if user else 0, command, upstream):
+                    await handler(update, context)
+            except RateLimited as e:
+                await update.message.reply_text(f"🐢 Slow down: try /{command} again in {e.retry_after:.0f}s")
+            except Overloaded:
+                await update.message.reply_text("🚦 The bot is busy right now, please try again shortly")
+        return wrapper
+
+    def stats(self) -> dict:
+        return {
+            "queues": {name: {"in_flight": g.in_flight, "waiting": g.waiting, "limit": g.limit}
+                       for name, g in self._gates.items()},
+            "admitted": dict(self.admitted),
+            "rejected": dict(self.rejected),
+        }
+
+
+def parse_limits(spec: Optional[str]) -> Dict[str, int]:
+    """Parse "openrouter:8,deepseek:4" into {"openrouter": 8, "deepseek": 4}"""
+    limits = {}
+    for item in (spec or "").split(","):
+        if ":" in item:
+            name, value = item.split(":", 1)
+            limits[name.strip()] = int(value)
+    return limits
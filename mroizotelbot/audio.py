@@ -0,0 +1,90 @@
+"""
+Voice message decoding and recognition.
+Telegram voice notes are OGG/Opus; they are decoded to 16 kHz mono PCM by
+ffmpeg worker processes over pipes (no temp files), and speech recognition
+runs on a thread pool so neither step blocks the event loop.
+SpeechRecognition is imported on first use.
+"""
+import asyncio
+import functools
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional
+
+from tracing import span
+
+if TYPE_CHECKING:
+    import speech_recognition as sr
+
+
+class AudioTooLong(Exception):
+    """Raised when a voice message exceeds the configured limits"""
+
+
+class NotUnderstood(Exception):
+    """Raised when the recognizer could not make out any speech"""
+
+
+def _recognize_google(audio: "sr.AudioData", language: str) -> str:
+    import speech_recognition as sr
+    try:
+        return sr.Recognizer().recognize_google(audio, language=language)
+    except sr.UnknownValueError:
+        raise NotUnderstood("could not understand the audio")
+
+
+class VoicePipeline:
+    """Bounded decode (ffmpeg processes) + recognize (threads) pipeline"""
+
+    def __init__(self, ffmpeg: str = "ffmpeg", max_duration: float = 120.0, max_bytes: int = 5 * 1024 * 1024,
+                 sample_rate: int = 16000, decode_concurrency: int = 2, recognize_workers: int = 4):
+        self.ffmpeg = shutil.which(ffmpeg) or ffmpeg
+        self.max_duration = max_duration
+        self.max_bytes = max_bytes
+        self.sample_rate = sample_rate
+        self._decode_slots = asyncio.Semaphore(decode_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=recognize_workers, thread_name_prefix="stt")
+
+    def check_limits(self, duration: Optional[float], file_size: Optional[int]) -> None:
+        """Reject voice notes before downloading them"""
+        if duration and duration > self.max_duration:
+            raise AudioTooLong(f"voice message is {duration:.0f}s, limit is {self.max_duration:.0f}s")
+        if file_size and file_size > self.max_bytes:
+            raise AudioTooLong(f"voice message is {file_size // 1024}KB, limit is {self.max_bytes // 1024}KB")
+
+    async def _ffmpeg(self, data: bytes, *args: str) -> bytes:
+        """Pipe bytes through one ffmpeg process, bounded by the decode slots"""
+        async with self._decode_slots:
+            process = await asyncio.create_subprocess_exec(
+                self.ffmpeg, "-hide_banner", "-loglevel", "error", "-i", "pipe:0", *args, "pipe:1",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            output, err = await process.communicate(data)
+        if process.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {err.decode(errors='ignore').strip() or process.returncode}")
+        return output
+
+    async def decode(self, ogg: bytes) -> "sr.AudioData":
+        """Decode OGG/Opus bytes to mono 16-bit PCM, truncated to max_duration"""
+        import speech_recognition as sr
+        with span("ffmpeg.decode"):
+            pcm = await self._ffmpeg(
+                ogg, "-t", str(self.max_duration), "-ac", "1", "-ar", str(self.sample_rate), "-f", "s16le"
+            )
+        return sr.AudioData(pcm, self.sample_rate, 2)
+
+    async def encode_opus(self, audio: bytes, bitrate: str = "32k") -> bytes:
+        """Encode any ffmpeg-readable audio (e.g. gTTS MP3) as an OGG/Opus voice note"""
+        with span("ffmpeg.encode"):
+            return await self._ffmpeg(audio, "-ac", "1", "-c:a", "libopus", "-b:a", bitrate, "-f", "ogg")
+
+    async def recognize_google(self, audio: "sr.AudioData", language: str = "en-US") -> str:
+        """Run Google speech recognition on decoded audio in the thread pool"""
+        loop = asyncio.get_running_loop()
+        with span("google.recognize"):
+            return await loop.run_in_executor(self._executor, functools.partial(_recognize_google, audio, language))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
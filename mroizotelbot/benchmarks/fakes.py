@@ -0,0 +1,365 @@
+"""
+Local stand-ins for external services used by the benchmarks.
+FakeBotApi speaks enough of the Telegram Bot API for python-telegram-bot:
+it serves getUpdates long-polls or pushes updates to a webhook, serves
+voice notes through getFile and file downloads, and records every outgoing
+message with a timestamp. FakeOpenRouter, FakeDeepSeek and
+FakeReddit answer the upstream calls the bot makes, with configurable
+latency, jitter and error injection.
+"""
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+
+class FakeBotApi:
+    """Minimal Bot API server: point ApplicationBuilder.base_url at `base_url`"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.sent: List[dict] = []
+        self.calls: Dict[str, int] = {}
+        self.files: Dict[str, bytes] = {}
+        self.webhook_url: Optional[str] = None
+        self.webhook_secret: Optional[str] = None
+        self._updates: asyncio.Queue = asyncio.Queue()
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._runner: Optional[web.AppRunner] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._waiters: List[asyncio.Future] = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/bot"
+
+    @property
+    def file_url(self) -> str:
+        """For ApplicationBuilder.base_file_url"""
+        return f"http://{self.host}:{self.port}/file/bot"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self._dispatch)
+        app.router.add_get("/file/bot{token}/{path:.+}", self._download)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._session = aiohttp.ClientSession()
+
+    async def stop(self) -> None:
+        if self._session:
+            await self._session.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    # region Update injection
+    def _user_message(self, chat_id: int, **content) -> dict:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"user{chat_id}"},
+            **content,
+        }
+
+    def voice_message(self, chat_id: int, audio: bytes, duration: int = 2) -> dict:
+        """A voice note message whose file can be fetched with getFile; use as `reply_to`"""
+        file_id = f"voice{next(self._message_ids)}"
+        self.files[file_id] = audio
+        return self._user_message(chat_id, voice={
+            "file_id": file_id, "file_unique_id": file_id, "duration": duration,
+            "mime_type": "audio/ogg", "file_size": len(audio),
+        })
+
+    def make_update(self, chat_id: int, text: str, reply_to: Optional[dict] = None) -> dict:
+        command = text.split()[0] if text.startswith("/") else None
+        message = self._user_message(chat_id, text=text)
+        if command:
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        if reply_to:
+            message["reply_to_message"] = reply_to
+        return {"update_id": next(self._update_ids), "message": message}
+
+    async def push(self, chat_id: int, text: str, reply_to: Optional[dict] = None) -> dict:
+        """Deliver an update by webhook if one is registered, else via getUpdates"""
+        update = self.make_update(chat_id, text, reply_to)
+        if self.webhook_url:
+            headers = {"X-Telegram-Bot-Api-Secret-Token": self.webhook_secret} if self.webhook_secret else {}
+            async with self._session.post(self.webhook_url, json=update, headers=headers) as response:
+                response.raise_for_status()
+        else:
+            await self._updates.put(update)
+        return update
+
+    async def wait_for_messages(self, count: int, timeout: float = 30.0) -> None:
+        """Block until at least `count` outgoing messages were recorded"""
+        deadline = time.perf_counter() + timeout
+        while len(self.sent) < count:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"only {len(self.sent)}/{count} messages received")
+            await asyncio.sleep(0.005)
+    # endregion
+
+    # region Bot API methods
+    async def _params(self, request: web.Request) -> dict:
+        if request.content_type == "application/json":
+            return await request.json()
+        params = dict(await request.post())
+        for key, value in params.items():
+            if isinstance(value, str) and value[:1] in "[{":
+                try:
+                    params[key] = json.loads(value)
+                except ValueError:
+                    pass
+        return params
+
+    async def _dispatch(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] = self.calls.get(method, 0) + 1
+        params = await self._params(request)
+        if self.latency and method != "getUpdates":
+            await asyncio.sleep(self.latency)
+        handler = getattr(self, f"_api_{method}", None)
+        result = await handler(params) if handler else True
+        return web.json_response({"ok": True, "result": result})
+
+    async def _api_getMe(self, params: dict) -> dict:
+        return {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+
+    async def _api_getUpdates(self, params: dict) -> list:
+        timeout = float(params.get("timeout") or 0)
+        updates = []
+        try:
+            updates.append(await asyncio.wait_for(self._updates.get(), timeout=max(timeout, 0.01)))
+        except asyncio.TimeoutError:
+            return []
+        while not self._updates.empty():
+            updates.append(self._updates.get_nowait())
+        return updates
+
+    async def _api_setWebhook(self, params: dict) -> bool:
+        self.webhook_url = params.get("url") or None
+        self.webhook_secret = params.get("secret_token") or None
+        return True
+
+    async def _api_deleteWebhook(self, params: dict) -> bool:
+        self.webhook_url = self.webhook_secret = None
+        return True
+
+    def _message(self, params: dict, **extra) -> dict:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+            **extra,
+        }
+        self.sent.append({"at": time.perf_counter(), "chat_id": message["chat"]["id"], **extra})
+        return message
+
+    async def _api_sendMessage(self, params: dict) -> dict:
+        return self._message(params, text=params.get("text", ""))
+
+    async def _api_editMessageText(self, params: dict) -> dict:
+        return self._message(params, text=params.get("text", ""))
+
+    async def _api_sendVoice(self, params: dict) -> dict:
+        return self._message(params, voice={"file_id": "voice-file", "file_unique_id": "voice", "duration": 1})
+
+    async def _api_getFile(self, params: dict) -> dict:
+        file_id = params.get("file_id", "")
+        return {"file_id": file_id, "file_unique_id": file_id, "file_size": len(self.files.get(file_id, b"")),
+                "file_path": f"voice/{file_id}.ogg"}
+
+    async def _download(self, request: web.Request) -> web.Response:
+        self.calls["download"] = self.calls.get("download", 0) + 1
+        file_id = request.match_info["path"].rsplit("/", 1)[-1].removesuffix(".ogg")
+        if file_id not in self.files:
+            return web.Response(status=404)
+        return web.Response(body=self.files[file_id], content_type="audio/ogg")
+    # endregion
+
+
+class FakeService:
+    """Base for fake upstreams: an aiohttp app with latency and error injection"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, tail_rate: float = 0.0,
+                 tail_latency: float = 0.0, seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter  # +/- fraction of latency
+        self.error_rate = error_rate
+        self.tail_rate = tail_rate  # fraction of calls that take tail_latency extra
+        self.tail_latency = tail_latency
+        self.calls: Dict[str, int] = {}
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def root(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def routes(self, app: web.Application) -> None:
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        app = web.Application(middlewares=[self._inject])
+        self.routes(app)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+    @web.middleware
+    async def _inject(self, request: web.Request, handler) -> web.StreamResponse:
+        self.calls[request.path] = self.calls.get(request.path, 0) + 1
+        if request.content_type != "multipart/form-data":
+            # Take the body now, since a hedged client may hang up during the delay. Multipart
+            # uploads are left unread for request.multipart(), which needs the raw stream.
+            await request.read()
+        if self.latency:
+            spread = self.latency * self.jitter
+            await asyncio.sleep(max(0.0, self.latency + self._random.uniform(-spread, spread)))
+        if self.tail_rate and self._random.random() < self.tail_rate:
+            await asyncio.sleep(self.tail_latency)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"error": {"message": "injected failure"}}, status=500)
+        return await handler(request)
+
+    async def stream_words(self, request: web.Request, words: List[str], event) -> web.StreamResponse:
+        """Send an SSE stream with one event per word, then [DONE]"""
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for word in words:
+            await response.write(f"data: {json.dumps(event(word + ' '))}\n\n".encode())
+            await asyncio.sleep(0)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+class FakeOpenRouter(FakeService):
+    """OpenRouter chat completions (JSON or SSE) and voice-to-text"""
+
+    answer = "This is a canned answer from the fake OpenRouter server."
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.root}/api/v1"
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/api/v1/chat/completions", self._completions)
+        app.router.add_post("/api/v1/voice-to-text", self._voice)
+
+    async def _completions(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        if payload.get("stream"):
+            return await self.stream_words(
+                request, self.answer.split(), lambda text: {"choices": [{"delta": {"content": text}}]}
+            )
+        return web.json_response({"choices": [{"message": {"role": "assistant", "content": self.answer}}]})
+
+    async def _voice(self, request: web.Request) -> web.Response:
+        size = 0
+        reader = await request.multipart()
+        async for part in reader:
+            while chunk := await part.read_chunk():
+                size += len(chunk)
+        return web.json_response({"text": f"fake transcription of {size} bytes"})
+
+
+class FakeDeepSeek(FakeService):
+    """DeepSeek /v1/ask (JSON or SSE)"""
+
+    answer = "This is a canned answer from the fake DeepSeek server."
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.root}/v1"
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/v1/ask", self._ask)
+
+    async def _ask(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        if payload.get("stream"):
+            return await self.stream_words(request, self.answer.split(), lambda text: {"answer": text})
+        return web.json_response({"answer": self.answer})
+
+
+class FakeReddit(FakeService):
+    """The Reddit endpoints PRAW uses for password auth, submit, listings and replies"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ids = itertools.count(1)
+        self.posts: Dict[str, dict] = {}
+        self.comments: List[dict] = []
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/api/v1/access_token", self._token)
+        app.router.add_post("/api/submit/", self._submit)
+        app.router.add_post("/api/comment/", self._comment)
+        app.router.add_get("/r/{subreddits}/new", self._new)
+        app.router.add_get("/comments/{post_id}/", self._post)
+
+    def _new_id(self) -> str:
+        return f"fake{next(self._ids)}"
+
+    async def _token(self, request: web.Request) -> web.Response:
+        return web.json_response({"access_token": "fake-token", "token_type": "bearer",
+                                  "expires_in": 3600, "scope": "*"})
+
+    async def _submit(self, request: web.Request) -> web.Response:
+        data = dict(await request.post())
+        post = self._make_post(data.get("sr", "test"), data.get("title", ""), data.get("text", ""))
+        return web.json_response({"json": {"errors": [], "data": {key: post[key] for key in ("id", "name", "url")}}})
+
+    def _make_post(self, subreddit: str, title: str, selftext: str) -> dict:
+        post_id = self._new_id()
+        self.posts[post_id] = post = {
+            "id": post_id, "name": f"t3_{post_id}", "title": title, "selftext": selftext,
+            "subreddit": subreddit, "created_utc": time.time(),
+            "url": f"{self.root}/r/{subreddit}/comments/{post_id}/", "permalink": f"/r/{subreddit}/comments/{post_id}/",
+        }
+        return post
+
+    async def _post(self, request: web.Request) -> web.Response:
+        post = self.posts.get(request.match_info["post_id"])
+        if post is None:
+            return web.json_response({"message": "Not Found", "error": 404}, status=404)
+        listing = lambda children: {"kind": "Listing", "data": {"children": children, "after": None, "before": None}}
+        return web.json_response([listing([{"kind": "t3", "data": post}]), listing([])])
+
+    async def _comment(self, request: web.Request) -> web.Response:
+        data = dict(await request.post())
+        comment_id = self._new_id()
+        self.comments.append(data)
+        thing = {"kind": "t1", "data": {"id": comment_id, "name": f"t1_{comment_id}", "body": data.get("text", ""),
+                                        "parent_id": data.get("thing_id"), "link_id": data.get("thing_id")}}
+        return web.json_response({"json": {"errors": [], "data": {"things": [thing]}}})
+
+    async def _new(self, request: web.Request) -> web.Response:
+        subreddits = request.match_info["subreddits"].split("+")
+        children = [{"kind": "t3", "data": self._make_post(subreddit, "Fake post", "Fake body")}
+                    for subreddit in subreddits]
+        return web.json_response({"kind": "Listing", "data": {"children": children, "after": None, "before": None}})
@@ -0,0 +1,218 @@
+"""
+Offline load test: the real bot against fake Telegram, OpenRouter, DeepSeek and Reddit.
+Starts the stand-ins from benchmarks/fakes.py, launches the bot process
+pointed at them, then drives each command at a fixed update rate and
+reports throughput, p50/p95/p99 reply latency, errors and bot memory.
+
+Usage: python benchmarks/load_test.py [--rate 20] [--duration 10] [--commands start,chat,deepseek,post,voice]
+       [--latency 0.2] [--error-rate 0.05] [--tail-rate 0.05 --tail-latency 2] [--route]
+       [--mode polling|webhook] [--processes 1]
+"""
+import argparse
+import asyncio
+import glob
+import os
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FakeBotApi, FakeDeepSeek, FakeOpenRouter, FakeReddit
+
+BOT = glob.glob(os.path.join(ROOT, "5F*.py"))[0]
+COMMANDS = {
+    "start": "/start",
+    "chat": "/chat load test question number {i}",
+    "deepseek": "/deepseek load test question number {i}",
+    "post": "/post loadtest title{i} load test body {i}",
+    "voice": "/voice_openrouter",  # sent as a reply to a voice note
+}
+VOICE_NOTE = b"OggS" + bytes(16 * 1024)
+ERROR_PREFIXES = ("❌", "⚠️", "🚦", "🐢", "🔌", "⌛")
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of a process and its children (Linux /proc only)"""
+    total, pending = 0, [pid]
+    try:
+        while pending:
+            current = pending.pop()
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+    except (FileNotFoundError, ProcessLookupError):
+        return total or None
+    return total
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] if ordered else float("nan")
+
+
+async def run_phase(api: FakeBotApi, pid: int, command: str, rate: float, duration: float,
+                    first_chat: int, timeout: float) -> dict:
+    """Push `command` at `rate`/s for `duration`s from fresh chats and collect replies"""
+    template = COMMANDS[command]
+    total = max(1, int(rate * duration))
+    pushed: Dict[int, float] = {}
+    memory: List[int] = []
+    baseline = rss_bytes(pid)
+    sent_before = len(api.sent)
+
+    async def sample_memory() -> None:
+        while True:
+            if (value := rss_bytes(pid)) is not None:
+                memory.append(value)
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.create_task(sample_memory())
+    started = time.perf_counter()
+    for i in range(total):
+        # Open loop: keep the schedule even when the bot falls behind
+        delay = started + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        chat_id = first_chat + i
+        reply_to = api.voice_message(chat_id, VOICE_NOTE) if command == "voice" else None
+        pushed[chat_id] = time.perf_counter()
+        await api.push(chat_id, template.format(i=i), reply_to)
+
+    replies: Dict[int, dict] = {}
+    deadline = time.perf_counter() + timeout
+    while len(replies) < total and time.perf_counter() < deadline:
+        for message in api.sent[sent_before:]:
+            if message["chat_id"] in pushed and message["chat_id"] not in replies:
+                replies[message["chat_id"]] = message
+        await asyncio.sleep(0.02)
+    sampler.cancel()
+
+    latencies = [(m["at"] - pushed[chat]) * 1000 for chat, m in replies.items()]
+    errors = sum(1 for m in replies.values() if str(m.get("text", "")).startswith(ERROR_PREFIXES))
+    finished = max((m["at"] for m in replies.values()), default=time.perf_counter())
+    return {
+        "command": command,
+        "pushed": total,
+        "replied": len(replies),
+        "errors": errors,
+        "throughput": len(replies) / max(1e-9, finished - started),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "rss_start": baseline,
+        "rss_peak": max(memory, default=baseline),
+        "rss_end": rss_bytes(pid),
+    }
+
+
+def report(result: dict) -> None:
+    mb = lambda value: f"{value / 2**20:6.1f}MB" if value else "     n/a"
+    print(f"{result['command']:9} {result['replied']:5}/{result['pushed']:<5} err {result['errors']:4}  "
+          f"{result['throughput']:6.1f}/s  p50 {result['p50']:7.1f}ms  p95 {result['p95']:7.1f}ms  "
+          f"p99 {result['p99']:7.1f}ms  rss {mb(result['rss_start'])} → peak {mb(result['rss_peak'])}")
+
+
+async def main(args) -> None:
+    upstream = dict(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                    tail_rate=args.tail_rate, tail_latency=args.tail_latency, seed=args.seed)
+    api = FakeBotApi()
+    openrouter, deepseek, reddit = FakeOpenRouter(**upstream), FakeDeepSeek(**upstream), FakeReddit(**upstream)
+    for service in (api, openrouter, deepseek, reddit):
+        await service.start()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ)
+        env.update({
+            "TELEGRAM_BOT_TOKEN": "123:fake",
+            "TELEGRAM_API_URL": api.base_url,
+            "TELEGRAM_FILE_URL": api.file_url,
+            "OPENROUTER_BASE_URL": openrouter.base_url,
+            "OPENROUTER_API_KEY": "fake",
+            "DEEPSEEK_BASE_URL": deepseek.base_url,
+            "DEEPSEEK_API_KEY": "fake",
+            "REDDIT_URL": reddit.root,
+            "REDDIT_OAUTH_URL": reddit.root,
+            "REDDIT_CLIENT_ID": "x", "REDDIT_CLIENT_SECRET": "x", "REDDIT_USERNAME": "x", "REDDIT_PASSWORD": "x",
+            "SEEN_POSTS_DB": os.path.join(workdir, "seen.db"),
+            "TTS_CACHE_DIR": os.path.join(workdir, "tts"),
+            "STREAM_REPLIES": "1" if args.stream else "0",
+            "RATE_LIMIT_PER_MIN": "1000000",
+            "RATE_LIMIT_BURST": "1000000",
+            "UPSTREAM_LIMITS": "openrouter:1000,deepseek:1000",
+            "WEBHOOK_WORKERS": str(args.webhook_workers),
+            "TRANSLATION_WORKERS": "0",
+            "METRICS_PORT": "0",
+            "BOT_PROCESSES": str(args.processes),
+            "BOT_LOOP": args.loop,
+            "BOT_MODE": args.mode,
+            "CHAT_ROUTING": "1" if args.route else "0",
+        })
+        if args.mode == "webhook":
+            port = free_port()
+            env.update({"WEBHOOK_URL": f"http://127.0.0.1:{port}", "WEBHOOK_LISTEN": "127.0.0.1",
+                        "WEBHOOK_PORT": str(port), "WEBHOOK_SECRET": "load-test"})
+        bot = await asyncio.create_subprocess_exec(
+            sys.executable, BOT, env=env, cwd=ROOT,
+            stdout=asyncio.subprocess.DEVNULL, stderr=None if args.verbose else asyncio.subprocess.DEVNULL
+        )
+        try:
+            if args.mode == "webhook":
+                while not api.webhook_url:
+                    await asyncio.sleep(0.05)
+            await api.push(1, "/start")  # wait until the bot is serving
+            await api.wait_for_messages(1, timeout=60)
+            print(f"{args.mode} mode, {args.processes} process(es); "
+                  f"upstream latency {args.latency * 1000:.0f}ms ±{args.jitter:.0%}, error rate {args.error_rate:.0%}, "
+                  f"{args.tail_rate:.0%} of calls +{args.tail_latency * 1000:.0f}ms; "
+                  f"{args.rate:g} updates/s for {args.duration:g}s per command"
+                  + (" (streaming: latency is time to first message)" if args.stream and not args.route else "")
+                  + (" (/chat routed and hedged)" if args.route else ""))
+            for index, command in enumerate(args.commands.split(",")):
+                result = await run_phase(api, bot.pid, command, args.rate, args.duration,
+                                         first_chat=100_000 * (index + 1), timeout=args.timeout)
+                report(result)
+        finally:
+            bot.terminate()
+            await bot.wait()
+            for service in (api, openrouter, deepseek, reddit):
+                await service.stop()
+    injected = openrouter.errors + deepseek.errors + reddit.errors
+    print(f"upstream calls: openrouter {sum(openrouter.calls.values())} "
+          f"({openrouter.calls.get('/api/v1/voice-to-text', 0)} voice), deepseek {sum(deepseek.calls.values())}, "
+          f"reddit {sum(reddit.calls.values())}; injected errors {injected}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=20.0, help="updates per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per command")
+    parser.add_argument("--commands", default=",".join(COMMANDS), help=f"comma-separated, from {', '.join(COMMANDS)}")
+    parser.add_argument("--latency", type=float, default=0.2, help="mean upstream latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.5, help="latency spread as a fraction of the mean")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls failing with 500")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="fraction of upstream calls that are slow")
+    parser.add_argument("--tail-latency", type=float, default=2.0, help="extra seconds for a slow upstream call")
+    parser.add_argument("--route", action="store_true", help="enable CHAT_ROUTING with hedged requests for /chat")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--stream", action="store_true", help="enable streamed replies")
+    parser.add_argument("--mode", default="polling", choices=("polling", "webhook"))
+    parser.add_argument("--webhook-workers", type=int, default=4, help="WEBHOOK_WORKERS for the bot under test")
+    parser.add_argument("--processes", type=int, default=1, help="BOT_PROCESSES for the bot under test")
+    parser.add_argument("--loop", default="asyncio", choices=("asyncio", "uvloop"))
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for stragglers per command")
+    parser.add_argument("--verbose", action="store_true", help="show the bot's log output")
+    asyncio.run(main(parser.parse_args()))
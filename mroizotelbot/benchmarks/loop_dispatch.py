@@ -0,0 +1,96 @@
+"""
+Handler dispatch micro-benchmark: asyncio vs nest_asyncio vs uvloop.
+Feeds prebuilt /ping updates through Application.process_update with a few
+awaits per handler (no replies; FakeBotApi only answers getMe) and reports updates per second for each
+event loop setup. Every mode runs in a fresh interpreter because
+nest_asyncio patches asyncio process-wide.
+
+Usage: python benchmarks/loop_dispatch.py [--updates 20000] [--concurrency 100] [--awaits 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+from telegram.ext import Application, CommandHandler, ContextTypes
+
+from benchmarks.fakes import FakeBotApi
+from runner import run
+
+MODES = ("asyncio", "nest_asyncio", "uvloop")
+
+
+def build(api: FakeBotApi, awaits: int) -> Application:
+    handled = []
+
+    async def ping(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        for _ in range(awaits):
+            await asyncio.sleep(0)
+        handled.append(update.update_id)
+
+    application = Application.builder().token("123:fake").base_url(api.base_url).build()
+    application.add_handler(CommandHandler("ping", ping))
+    application.bot_data["handled"] = handled
+    return application
+
+
+async def dispatch(updates: int, concurrency: int, awaits: int) -> dict:
+    api = FakeBotApi()
+    await api.start()
+    application = build(api, awaits)
+    await application.initialize()
+    raw = [api.make_update(1000 + i % 50, "/ping") for i in range(updates)]
+    parsed = [Update.de_json(data, application.bot) for data in raw]
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(update: Update) -> None:
+        async with slots:
+            await application.process_update(update)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(update) for update in parsed))
+    elapsed = time.perf_counter() - started
+    assert len(application.bot_data["handled"]) == updates
+    await application.shutdown()
+    await api.stop()
+    return {"updates_per_sec": updates / elapsed, "elapsed": elapsed}
+
+
+def child(mode: str, args) -> None:
+    if mode == "nest_asyncio":
+        import nest_asyncio
+        nest_asyncio.apply()
+    loop = "uvloop" if mode == "uvloop" else "asyncio"
+    print(json.dumps(run(dispatch(args.updates, args.concurrency, args.awaits), loop)))
+
+
+def main(args) -> None:
+    for mode in args.modes.split(","):
+        command = [sys.executable, __file__, "--child", mode, "--updates", str(args.updates),
+                   "--concurrency", str(args.concurrency), "--awaits", str(args.awaits)]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"{mode:12}: skipped ({result.stderr.strip().splitlines()[-1]})")
+            continue
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{mode:12}: {stats['updates_per_sec']:9.0f} updates/s  ({stats['elapsed']:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--awaits", type=int, default=5, help="event loop switches per handler")
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parsed = parser.parse_args()
+    if parsed.child:
+        child(parsed.child, parsed)
+    else:
+        main(parsed)
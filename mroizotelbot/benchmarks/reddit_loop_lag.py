@@ -0,0 +1,67 @@
+"""
+Loop-lag benchmark for Reddit calls.
+Simulates blocking PRAW requests and compares how long the event loop is
+blocked when they run inline (old behaviour) versus through RedditGateway.
+
+Usage: python benchmarks/reddit_loop_lag.py [--calls 10] [--latency 0.3]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loop_monitor import LoopLagMonitor
+from reddit_io import RedditGateway
+
+
+class FakePost:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def reply(self, text: str):
+        time.sleep(self.latency)
+
+
+async def settle(monitor: LoopLagMonitor, min_samples: int = 5) -> None:
+    """Let the heartbeat record the last block and take at least `min_samples` samples"""
+    await asyncio.sleep(2 * monitor.interval)
+    while monitor.samples < min_samples:
+        await asyncio.sleep(monitor.interval)
+
+
+async def run(calls: int, latency: float) -> None:
+    post = FakePost(latency)
+    gateway = RedditGateway(lambda: None, max_workers=4)
+    monitor = LoopLagMonitor(interval=0.01, report_every=0)
+    monitor.start()
+    await settle(monitor)
+    monitor.reset()
+
+    for _ in range(calls):
+        post.reply("inline")
+        await asyncio.sleep(0)
+    await settle(monitor)
+    before = monitor.snapshot()
+    monitor.reset()
+
+    await asyncio.gather(*(gateway.reply(post, "pooled") for _ in range(calls)))
+    await settle(monitor)
+    after = monitor.snapshot()
+
+    await monitor.stop()
+    gateway.shutdown()
+    print(f"inline : max loop block {before['max_lag'] * 1000:7.1f}ms, avg {before['avg_lag'] * 1000:6.2f}ms"
+          f" ({before['samples']} samples)")
+    print(f"gateway: max loop block {after['max_lag'] * 1000:7.1f}ms, avg {after['avg_lag'] * 1000:6.2f}ms"
+          f" ({after['samples']} samples)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.3)
+    args = parser.parse_args()
+    asyncio.run(run(args.calls, args.latency))
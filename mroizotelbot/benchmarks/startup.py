@@ -0,0 +1,109 @@
+"""
+Startup benchmark: bot import time and time to first handled update.
+Imports the bot module in fresh interpreters, then launches the bot against
+FakeBotApi with a /start already queued and times the first reply. Heavy
+feature libraries loaded at import are listed, and budgets can fail the run.
+
+Usage: python benchmarks/startup.py [--runs 5] [--max-import-ms 800] [--max-first-update-ms 3000]
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FakeBotApi
+
+BOT = glob.glob(os.path.join(ROOT, "5F*.py"))[0]
+HEAVY = ["praw", "gtts", "speech_recognition", "googletrans", "argostranslate"]
+
+IMPORT_PROBE = """
+import importlib.util, json, sys, time
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("bot", sys.argv[1])
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+print(json.dumps({"seconds": time.perf_counter() - started,
+                  "heavy": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+
+def bot_env(workdir: str, **extra) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "TELEGRAM_BOT_TOKEN": "123:fake",
+        "REDDIT_CLIENT_ID": "x", "REDDIT_CLIENT_SECRET": "x", "REDDIT_USERNAME": "x", "REDDIT_PASSWORD": "x",
+        "SEEN_POSTS_DB": os.path.join(workdir, "seen.db"),
+        "TTS_CACHE_DIR": os.path.join(workdir, "tts"),
+        "TRANSLATION_WORKERS": "0",
+        "LOOP_LAG_REPORT_INTERVAL": "0",
+    })
+    env.update(extra)
+    return env
+
+
+async def measure_import(env: dict) -> dict:
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", IMPORT_PROBE, BOT, *HEAVY, env=env, cwd=ROOT,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+    )
+    output, _ = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError("bot import failed; run the probe by hand to see why")
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+async def measure_first_update(workdir: str) -> float:
+    api = FakeBotApi()
+    await api.start()
+    await api.push(1, "/start")
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, BOT, env=bot_env(workdir, TELEGRAM_API_URL=api.base_url), cwd=ROOT,
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        await api.wait_for_messages(1, timeout=60)
+        return api.sent[0]["at"] - started
+    finally:
+        process.terminate()
+        await process.wait()
+        await api.stop()
+
+
+async def main(args) -> int:
+    with tempfile.TemporaryDirectory() as workdir:
+        imports = [await measure_import(bot_env(workdir)) for _ in range(args.runs)]
+        firsts = [await measure_first_update(workdir) for _ in range(args.runs)]
+    import_ms = statistics.median(r["seconds"] for r in imports) * 1000
+    first_ms = statistics.median(firsts) * 1000
+    print(f"import        : median {import_ms:7.1f}ms  (min {min(r['seconds'] for r in imports) * 1000:.1f}ms)")
+    print(f"first update  : median {first_ms:7.1f}ms  (min {min(firsts) * 1000:.1f}ms)")
+    print(f"heavy at import: {', '.join(imports[0]['heavy']) or 'none'}")
+
+    failed = False
+    if args.max_import_ms and import_ms > args.max_import_ms:
+        print(f"FAIL: import {import_ms:.0f}ms exceeds budget {args.max_import_ms:.0f}ms")
+        failed = True
+    if args.max_first_update_ms and first_ms > args.max_first_update_ms:
+        print(f"FAIL: first update {first_ms:.0f}ms exceeds budget {args.max_first_update_ms:.0f}ms")
+        failed = True
+    if args.no_heavy and imports[0]["heavy"]:
+        print(f"FAIL: feature libraries loaded at import: {', '.join(imports[0]['heavy'])}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=0, help="fail above this median (0 = no budget)")
+    parser.add_argument("--max-first-update-ms", type=float, default=0, help="fail above this median (0 = no budget)")
+    parser.add_argument("--no-heavy", action="store_true", help="fail if any feature library is imported eagerly")
+    sys.exit(asyncio.run(main(parser.parse_args())))
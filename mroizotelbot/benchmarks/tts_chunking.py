@@ -0,0 +1,61 @@
+"""
+TTS chunking benchmark.
+Compares one gTTS call for the whole text against sentence-chunked,
+concurrent synthesis through ChunkedSynthesizer. By default gTTS is
+simulated with a fixed latency per 100 characters (gTTS issues one request
+per ~100-char token); pass --live to hit the real service.
+
+Usage: python benchmarks/tts_chunking.py [--sentences 20] [--concurrency 4] [--live]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tts import ChunkedSynthesizer, gtts_synthesize
+
+SENTENCE = "The quick brown fox jumps over the lazy dog while the bot keeps answering other chats."
+
+
+def simulated_synthesize(latency_per_100: float):
+    def synthesize(lang: str, text: str) -> bytes:
+        time.sleep(latency_per_100 * max(1, -(-len(text) // 100)))
+        return b"\xff\xfb" + text.encode()[:16]
+    return synthesize
+
+
+async def run(sentences: int, concurrency: int, chunk_chars: int, live: bool, latency: float) -> None:
+    text = " ".join([SENTENCE] * sentences)
+    synthesize = gtts_synthesize if live else simulated_synthesize(latency)
+
+    single = ChunkedSynthesizer(max_concurrency=1, chunk_chars=len(text) + 1, synthesize=synthesize)
+    chunked = ChunkedSynthesizer(max_concurrency=concurrency, chunk_chars=chunk_chars, synthesize=synthesize)
+
+    started = time.perf_counter()
+    await single.synthesize_mp3("en", text)
+    single_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await chunked.synthesize_mp3("en", text)
+    chunked_time = time.perf_counter() - started
+
+    single.shutdown()
+    chunked.shutdown()
+    print(f"text: {len(text)} chars, {'live gTTS' if live else f'simulated {latency * 1000:.0f}ms/100 chars'}")
+    print(f"single call      : {single_time:6.2f}s")
+    print(f"chunked (x{concurrency:<2})    : {chunked_time:6.2f}s")
+    print(f"speedup          : {single_time / chunked_time:6.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sentences", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--chunk-chars", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.15, help="simulated seconds per 100 chars")
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.sentences, args.concurrency, args.chunk_chars, args.live, args.latency))
@@ -0,0 +1,111 @@
+"""
+Update latency benchmark: polling vs webhook.
+Runs a minimal /ping bot against FakeBotApi in each serving mode, pushes
+updates from several chats and reports push-to-reply latency.
+
+Usage: python benchmarks/update_latency.py [--updates 200] [--chats 20] [--workers 4]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+from telegram.ext import Application, CommandHandler, ContextTypes
+
+from benchmarks.fakes import FakeBotApi
+from runner import ChatOrderedUpdateProcessor
+from webhook import WebhookSettings, serve_webhook
+
+
+async def ping(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await update.message.reply_text(f"pong {context.args[0]}")
+
+
+def build(api: FakeBotApi, concurrent: int) -> Application:
+    application = (
+        Application.builder()
+        .token("123:fake")
+        .base_url(api.base_url)
+        .concurrent_updates(ChatOrderedUpdateProcessor(concurrent))  # as the bot does
+        .build()
+    )
+    application.add_handler(CommandHandler("ping", ping))
+    return application
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def drive(api: FakeBotApi, updates: int, chats: int, rate: float) -> list:
+    pushed = {}
+    for i in range(updates):
+        pushed[str(i)] = time.perf_counter()
+        await api.push(1000 + i % chats, f"/ping {i}")
+        if rate:
+            await asyncio.sleep(1 / rate)
+    await api.wait_for_messages(updates)
+    return [(m["at"] - pushed[m["text"].split()[1]]) * 1000 for m in api.sent]
+
+
+async def run_polling(updates: int, chats: int, rate: float, workers: int) -> list:
+    api = FakeBotApi()
+    await api.start()
+    application = build(api, workers)
+    await application.initialize()
+    await application.updater.start_polling(poll_interval=0.0, timeout=10)
+    await application.start()
+    try:
+        return await drive(api, updates, chats, rate)
+    finally:
+        await application.updater.stop()
+        await application.stop()
+        await application.shutdown()
+        await api.stop()
+
+
+async def run_webhook(updates: int, chats: int, rate: float, workers: int) -> list:
+    api = FakeBotApi()
+    await api.start()
+    port = free_port()
+    settings = WebhookSettings(url=f"http://127.0.0.1:{port}", listen="127.0.0.1", port=port,
+                               secret_token="bench-secret", workers=workers)
+    stop = asyncio.Event()
+    server = asyncio.create_task(serve_webhook(build(api, workers), settings, stop))
+    while not api.webhook_url:
+        await asyncio.sleep(0.01)
+    try:
+        return await drive(api, updates, chats, rate)
+    finally:
+        stop.set()
+        await server
+        await api.stop()
+
+
+def report(name: str, latencies: list) -> None:
+    latencies = sorted(latencies)
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+    print(f"{name:8}: n={len(latencies)} mean {statistics.mean(latencies):6.1f}ms  "
+          f"p50 {pct(50):6.1f}ms  p95 {pct(95):6.1f}ms  p99 {pct(99):6.1f}ms")
+
+
+async def main(args) -> None:
+    report("polling", await run_polling(args.updates, args.chats, args.rate, args.workers))
+    report("webhook", await run_webhook(args.updates, args.chats, args.rate, args.workers))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=100.0, help="updates per second (0 = as fast as possible)")
+    parser.add_argument("--workers", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
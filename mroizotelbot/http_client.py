@@ -0,0 +1,63 @@
+"""
+Shared HTTP client for outbound API calls (OpenRouter, DeepSeek).
+One pooled aiohttp session is opened at bot startup and closed on shutdown,
+so keep-alive connections and DNS lookups are reused across messages.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import aiohttp
+
+
+@dataclass
+class HttpSettings:
+    """Connection pool and timeout configuration"""
+    total_timeout: float = 60.0
+    connect_timeout: float = 10.0
+    read_timeout: float = 45.0
+    limit: int = 100
+    limit_per_host: int = 20
+    dns_ttl: int = 300
+    keepalive_timeout: float = 30.0
+
+
+class HttpClient:
+    """Application-scoped wrapper around a single pooled ClientSession"""
+
+    def __init__(self, settings: Optional[HttpSettings] = None):
+        self.settings = settings or HttpSettings()
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        """Open the pooled session (idempotent)"""
+        if self._session and not self._session.closed:
+            return
+        s = self.settings
+        connector = aiohttp.TCPConnector(
+            limit=s.limit,
+            limit_per_host=s.limit_per_host,
+            ttl_dns_cache=s.dns_ttl,
+            use_dns_cache=True,
+            keepalive_timeout=s.keepalive_timeout,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=s.total_timeout,
+            sock_connect=s.connect_timeout,
+            sock_read=s.read_timeout,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        logging.info(f"🌐 HTTP pool ready (limit={s.limit}, per_host={s.limit_per_host})")
+
+    async def close(self) -> None:
+        """Close the session and release pooled connections"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the live session, failing loudly if startup never ran"""
+        if self._session is None or self._session.closed:
+            raise RuntimeError("HTTP client not started")
+        return self._session
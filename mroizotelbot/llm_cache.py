@@ -0,0 +1,146 @@
+"""
+Response cache for LLM completions.
+Entries are keyed by a hash of (provider, model, normalized messages), held
+in an in-memory LRU with TTL and optionally mirrored to SQLite, where each
+write purges expired rows and trims the table to `max_disk_entries`. Concurrent
+misses for the same key share one upstream call (single-flight).
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class ResponseCache:
+    """LRU + TTL cache with optional disk tier and in-flight coalescing"""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0, disk_path: Optional[str] = None,
+                 max_disk_entries: int = 10000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._disk: Optional[sqlite3.Connection] = None
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._disk.execute("CREATE INDEX IF NOT EXISTS llm_cache_expires_at ON llm_cache (expires_at)")
+            self._purge()
+            self._disk.commit()
+
+    @staticmethod
+    def key(provider: str, model: str, messages: List[dict]) -> str:
+        """Content address for a request; whitespace differences do not matter"""
+        normalized = [
+            {"role": m.get("role", "user"), "content": " ".join(str(m.get("content", "")).split())}
+            for m in messages
+        ]
+        blob = json.dumps([provider, model, normalized], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up memory then disk; expired entries count as misses"""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry and entry[0] > now:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry:
+            del self._memory[key]
+        if self._disk:
+            row = self._disk.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row:
+                self._remember(key, row[0], row[1])
+                self.hits += 1
+                self.disk_hits += 1
+                return row[0]
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at)
+        if self._disk:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at)
+            )
+            self._purge()
+            self._disk.commit()
+
+    def _purge(self) -> None:
+        """Drop expired rows, then the oldest ones beyond max_disk_entries"""
+        self._disk.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        # Every row gets the same TTL, so the earliest expiry is the oldest write
+        self._disk.execute(
+            "DELETE FROM llm_cache WHERE expires_at <= (SELECT expires_at FROM llm_cache "
+            "ORDER BY expires_at DESC LIMIT 1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Optional[str]]]) -> Tuple[Optional[str], str]:
+        """
+        Return (value, source) where source is "hit", "shared" (joined an
+        in-flight call) or "fetched" (this caller ran `fetch`). Empty results
+        and exceptions are never cached.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached, "hit"
+        pending = self._inflight.get(key)
+        if pending:
+            self.coalesced += 1
+            return await asyncio.shield(pending), "shared"
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody is waiting
+            raise
+        else:
+            if value:
+                self.set(key, value)
+            future.set_result(value)
+            return value, "fetched"
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "size": len(self._memory),
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        if self._disk:
+            self._disk.close()
+            self._disk = None
@@ -0,0 +1,64 @@
+"""
+Event loop lag monitor.
+A heartbeat task sleeps for a fixed interval and records how late it wakes
+up; the overshoot is the time the loop was blocked by synchronous work.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+
+class LoopLagMonitor:
+    """Measure event loop blocking time with a periodic heartbeat"""
+
+    def __init__(self, interval: float = 0.05, report_every: float = 300.0):
+        self.interval = interval
+        self.report_every = report_every
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.samples = 0
+        self._window_max = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the heartbeat on the running loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the heartbeat"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        """Return lag statistics in seconds"""
+        return {
+            "max_lag": self.max_lag,
+            "avg_lag": self.total_lag / self.samples if self.samples else 0.0,
+            "samples": self.samples,
+        }
+
+    def reset(self) -> None:
+        self.max_lag = self.total_lag = self._window_max = 0.0
+        self.samples = 0
+
+    async def _run(self) -> None:
+        last_report = time.perf_counter()
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.samples += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            self._window_max = max(self._window_max, lag)
+            if self.report_every and time.perf_counter() - last_report >= self.report_every:
+                logging.info(f"⏱ Event loop blocked up to {self._window_max * 1000:.0f}ms in the last {self.report_every:.0f}s")
+                self._window_max = 0.0
+                last_report = time.perf_counter()
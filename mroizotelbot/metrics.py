@@ -0,0 +1,182 @@
+"""
+Prometheus-style metrics.
+Handlers and upstream calls are timed into latency histograms, with error
+counters by exception type and in-flight gauges. The registry renders the
+text exposition format, served by a small aiohttp endpoint on localhost.
+"""
+import bisect
+import functools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+HANDLER = "bot_handler"
+UPSTREAM = "bot_upstream"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """Registry of histograms, counters and gauges keyed by name and labels"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.gauges: Dict[str, Dict[Labels, float]] = {}
+        self._collectors: List[Callable[["Metrics"], None]] = []
+
+    @staticmethod
+    def _labels(labels: dict) -> Labels:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        series = self.histograms.setdefault(name, {})
+        key = self._labels(labels)
+        if key not in series:
+            series[key] = Histogram(self.buckets)
+        series[key].observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        series = self.counters.setdefault(name, {})
+        key = self._labels(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def add(self, name: str, amount: float, **labels) -> None:
+        series = self.gauges.setdefault(name, {})
+        key = self._labels(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Set a gauge to an absolute value"""
+        self.gauges.setdefault(name, {})[self._labels(labels)] = value
+
+    def set_total(self, name: str, value: float, **labels) -> None:
+        """Mirror a counter that is kept elsewhere"""
+        self.counters.setdefault(name, {})[self._labels(labels)] = value
+
+    def collect(self, collector: Callable[["Metrics"], None]) -> None:
+        """Call `collector` before each render, to copy live state into the registry"""
+        self._collectors.append(collector)
+
+    @asynccontextmanager
+    async def track(self, family: str, **labels):
+        """Time the block into `<family>_duration_seconds`, counting errors and in-flight"""
+        self.add(f"{family}_in_flight", 1, **labels)
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.inc(f"{family}_errors_total", **labels, error=type(e).__name__)
+            raise
+        finally:
+            self.observe(f"{family}_duration_seconds", time.perf_counter() - started, **labels)
+            self.add(f"{family}_in_flight", -1, **labels)
+
+    def upstream(self, name: str):
+        """Shorthand for tracking a call to an external service"""
+        return self.track(UPSTREAM, upstream=name)
+
+    def instrument(self, handler: Callable[..., Awaitable[None]], command: str):
+        """Wrap a Telegram handler callback with per-command metrics"""
+        @functools.wraps(handler)
+        async def wrapper(update, context):
+            async with self.track(HANDLER, command=command):
+                await handler(update, context)
+        return wrapper
+
+    def quantile(self, name: str, q: float, **labels) -> Optional[float]:
+        histogram = self.histograms.get(name, {}).get(self._labels(labels))
+        return histogram.quantile(q) if histogram else None
+
+    def render(self) -> str:
+        """Text exposition format (version 0.0.4)"""
+        for collector in self._collectors:
+            collector(self)
+
+        def fmt(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ""
+            escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines = []
+        for name, series in sorted(self.histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{fmt(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{fmt(labels)} {histogram.count}")
+        for kind, families in (("counter", self.counters), ("gauge", self.gauges)):
+            for name, series in sorted(families.items()):
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{fmt(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serve a registry at GET /metrics"""
+
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: int = 9464):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            logging.error(f"Metrics endpoint disabled: cannot bind {self.host}:{self.port} ({str(e)})")
+            await self.stop()
+            return
+        logging.info(f"📈 Metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.metrics.render(),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
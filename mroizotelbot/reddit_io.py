@@ -0,0 +1,79 @@
+"""
+Reddit access layer.
+PRAW is synchronous, so every call is pushed onto a bounded thread pool and
+awaited from the handlers; Telegram updates keep flowing during Reddit I/O.
+The client (and PRAW itself) is only created on the first Reddit call.
+"""
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import praw
+
+
+class RedditGateway:
+    """Async facade over a praw.Reddit client backed by a thread pool"""
+
+    def __init__(self, factory: Callable[[], "praw.Reddit"], max_workers: int = 4):
+        self.factory = factory
+        self._reddit: Optional["praw.Reddit"] = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reddit")
+
+    @property
+    def reddit(self) -> "praw.Reddit":
+        """Build the client on first use; only ever called from pool threads"""
+        if self._reddit is None:
+            with self._lock:
+                if self._reddit is None:
+                    self._reddit = self.factory()
+        return self._reddit
+
+    async def _run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking PRAW call in the pool and log its duration"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        finally:
+            logging.debug(f"Reddit call {getattr(func, '__name__', func)} took {time.perf_counter() - started:.3f}s")
+
+    async def submit(self, subreddit: str, title: str, selftext: str) -> str:
+        """Create a text post and return its URL"""
+        def post() -> str:
+            submission = self.reddit.subreddit(subreddit).submit(title, selftext=selftext)
+            # The submit response carries no url, so reading it fetches the post; keep that in the pool
+            return submission.url
+        return await self._run(post)
+
+    async def latest_posts(self, subreddits: List[str], per_sub: int = 5) -> Dict[str, object]:
+        """Return the newest submission per subreddit using one combined listing request"""
+        def fetch():
+            wanted = {name.lower(): name for name in subreddits}
+            latest: Dict[str, object] = {}
+            combined = self.reddit.subreddit("+".join(wanted.values()))
+            for post in combined.new(limit=min(100, per_sub * len(wanted))):
+                key = post.subreddit.display_name.lower()
+                if key in wanted and wanted[key] not in latest:
+                    latest[wanted[key]] = post
+            # Quiet subreddits can be crowded out of the combined listing
+            for name in wanted.values():
+                if name not in latest:
+                    post = next(iter(self.reddit.subreddit(name).new(limit=1)), None)
+                    if post:
+                        latest[name] = post
+            return latest
+        return await self._run(fetch)
+
+    async def reply(self, post, text: str):
+        """Reply to a submission or comment"""
+        return await self._run(post.reply, text)
+
+    def shutdown(self) -> None:
+        """Stop accepting work; in-flight calls are allowed to finish"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,221 @@
+"""
+Failure handling for upstream AI providers.
+Each provider gets a circuit breaker that opens when the recent failure
+rate crosses a threshold, so a degraded provider fails fast instead of
+queuing work. Transient errors are retried with exponential backoff and
+full jitter, but only while the provider's retry budget allows it, and
+every call runs under a strict deadline that covers all attempts.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+import aiohttp
+
+T = TypeVar("T")
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a provider whose breaker is open"""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} is temporarily unavailable, retry in {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised when a call's overall deadline passes (not a single attempt's socket timeout)"""
+
+    def __init__(self, provider: str, deadline: float):
+        super().__init__(f"{provider} did not answer within {deadline:g}s")
+        self.provider = provider
+        self.deadline = deadline
+
+
+class CircuitBreaker:
+    """Closed → open on a high failure rate; half-open probes decide when to close"""
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 5,
+                 window: float = 60.0, open_for: float = 30.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_for = open_for
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.trips = 0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._probing = False
+
+    def _prune(self, now: float) -> None:
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def current_failure_rate(self) -> float:
+        self._prune(time.monotonic())
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def available(self) -> bool:
+        """Whether a call would go through now, without claiming the probe"""
+        if self.state == "closed":
+            return True
+        return not self._probing and time.monotonic() >= self.opened_at + self.open_for
+
+    def before_call(self) -> None:
+        """Raise CircuitOpen unless a call may go through now"""
+        if self.state == "closed":
+            return
+        remaining = self.opened_at + self.open_for - time.monotonic()
+        if self.state == "open" and remaining > 0:
+            raise CircuitOpen(self.name, remaining)
+        # Open period over: let a single probe through
+        if self._probing:
+            raise CircuitOpen(self.name, max(remaining, 1.0))
+        self.state = "half_open"
+        self._probing = True
+
+    def record(self, ok: bool) -> None:
+        now = time.monotonic()
+        if self.state == "half_open":
+            self._probing = False
+            if ok:
+                self.state = "closed"
+                self._outcomes.clear()
+            else:
+                self._open(now)
+            return
+        self._outcomes.append((now, ok))
+        self._prune(now)
+        if (not ok and len(self._outcomes) >= self.min_calls
+                and self.current_failure_rate() >= self.failure_rate):
+            self._open(now)
+
+    def cancelled(self) -> None:
+        """A cancelled call says nothing about the provider; free the probe slot"""
+        if self.state == "half_open":
+            self._probing = False
+
+    def _open(self, now: float) -> None:
+        self.state = "open"
+        self.opened_at = now
+        self.trips += 1
+        self._outcomes.clear()
+
+
+class RetryBudget:
+    """Each call deposits `ratio` tokens and each retry spends one, capped at `capacity`"""
+
+    def __init__(self, ratio: float = 0.2, capacity: float = 10.0):
+        self.ratio = ratio
+        self.capacity = capacity
+        self.tokens = capacity
+        self.exhausted = 0
+
+    def deposit(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.exhausted += 1
+        return False
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Connection failures, 429 and 5xx are worth another try; everything else is not"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, aiohttp.ClientConnectionError)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random) -> float:
+    """Full jitter: uniform in [0, min(cap, base * 2**attempt)]"""
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class Resilience:
+    """Per-provider breakers and retry budgets around deadline-bound calls"""
+
+    def __init__(self, deadline: float = 30.0, max_attempts: int = 3, base_delay: float = 0.25,
+                 max_delay: float = 4.0, failure_rate: float = 0.5, min_calls: int = 5,
+                 window: float = 60.0, open_for: float = 30.0, retry_ratio: float = 0.2,
+                 retry_capacity: float = 10.0):
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._breaker_settings = dict(failure_rate=failure_rate, min_calls=min_calls, window=window, open_for=open_for)
+        self._budget_settings = dict(ratio=retry_ratio, capacity=retry_capacity)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._budgets: Dict[str, RetryBudget] = {}
+        self.retries: Dict[str, int] = {}
+        self.timeouts: Dict[str, int] = {}
+        self._rng = random.Random()
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        if provider not in self._breakers:
+            self._breakers[provider] = CircuitBreaker(provider, **self._breaker_settings)
+        return self._breakers[provider]
+
+    def budget(self, provider: str) -> RetryBudget:
+        if provider not in self._budgets:
+            self._budgets[provider] = RetryBudget(**self._budget_settings)
+        return self._budgets[provider]
+
+    async def call(self, provider: str, attempt: Callable[[], Awaitable[T]], deadline: Optional[float] = None) -> T:
+        """
+        Run `attempt` until it succeeds, fails with a non-retryable error,
+        runs out of attempts or retry budget, or the deadline passes
+        (DeadlineExceeded). Raises CircuitOpen without calling when the
+        provider's breaker is open.
+        """
+        breaker, budget = self.breaker(provider), self.budget(provider)
+        budget.deposit()
+        deadline = deadline or self.deadline
+        expires = time.monotonic() + deadline
+        number = 0
+        while True:
+            breaker.before_call()
+            scope = asyncio.timeout(max(0.0, expires - time.monotonic()))
+            try:
+                async with scope:
+                    result = await attempt()
+            except asyncio.CancelledError:
+                breaker.cancelled()
+                raise
+            except Exception as e:
+                breaker.record(False)
+                # aiohttp's connect/read timeouts subclass asyncio.TimeoutError; only our deadline is final
+                if scope.expired():
+                    self.timeouts[provider] = self.timeouts.get(provider, 0) + 1
+                    raise DeadlineExceeded(provider, deadline) from e
+                delay = backoff_delay(number, self.base_delay, self.max_delay, self._rng)
+                if (not is_retryable(e) or number + 1 >= self.max_attempts
+                        or time.monotonic() + delay >= expires or not budget.try_spend()):
+                    raise
+                self.retries[provider] = self.retries.get(provider, 0) + 1
+                number += 1
+                await asyncio.sleep(delay)
+            else:
+                breaker.record(True)
+                return result
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "state": breaker.state,
+                "failure_rate": breaker.current_failure_rate(),
+                "trips": breaker.trips,
+                "retries": self.retries.get(name, 0),
+                "timeouts": self.timeouts.get(name, 0),
+                "budget_exhausted": self.budget(name).exhausted,
+            }
+            for name, breaker in self._breakers.items()
+        }
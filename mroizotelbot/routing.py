@@ -0,0 +1,175 @@
+"""
+Latency-aware routing across interchangeable chat providers.
+Each route keeps an EWMA of its recent latency, and a request goes to the
+fastest route whose circuit breaker lets calls through, discounted by its
+recent failure rate. If the chosen route has not answered by its own
+recent p95 (HEDGE_QUANTILE), a hedged request goes to the next best route;
+the first answer wins and the other request is cancelled. Hedges draw from
+a token budget so a slow provider cannot double the upstream load, and a
+route that fails outright fails over to the next one.
+"""
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from metrics import Metrics
+from resilience import Resilience, RetryBudget
+
+T = TypeVar("T")
+
+ROUTED = "bot_routed"
+
+
+@dataclass
+class Route:
+    """One provider (and optional model) a chat request can be sent to"""
+    name: str
+    provider: str  # circuit breaker key, e.g. "openrouter"
+    model: Optional[str] = None
+    ewma: Optional[float] = None
+    samples: Deque[float] = field(default_factory=lambda: deque(maxlen=200))
+    requests: int = 0
+    wins: int = 0
+
+    def observe(self, seconds: float, alpha: float) -> None:
+        self.ewma = seconds if self.ewma is None else alpha * seconds + (1 - alpha) * self.ewma
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def parse_routes(spec: str) -> List[Route]:
+    """"openrouter:mistralai/mistral-7b-instruct,deepseek" → one route per entry"""
+    routes = []
+    for item in (part.strip() for part in spec.split(",")):
+        if item:
+            provider, _, model = item.partition(":")
+            routes.append(Route(item, provider, model or None))
+    return routes
+
+
+class Router:
+    """Pick the best route per request and hedge the slow ones"""
+
+    def __init__(self, routes: List[Route], resilience: Resilience, alpha: float = 0.2,
+                 hedge_quantile: float = 0.95, hedge_delay: float = 2.0, min_hedge_delay: float = 0.05,
+                 min_samples: int = 20, hedge_ratio: float = 0.1, hedge_capacity: float = 5.0,
+                 metrics: Optional[Metrics] = None):
+        if not routes:
+            raise ValueError("Router needs at least one route")
+        self.routes = routes
+        self.resilience = resilience
+        self.alpha = alpha
+        self.hedge_quantile = hedge_quantile
+        self.default_hedge_delay = hedge_delay  # used until a route has min_samples latencies
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.metrics = metrics
+        self.hedges = RetryBudget(ratio=hedge_ratio, capacity=hedge_capacity)
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def _score(self, route: Route) -> float:
+        if route.ewma is None:
+            return 0.0  # measure unknown routes first
+        healthy = 1.0 - self.resilience.breaker(route.provider).current_failure_rate()
+        return route.ewma / max(0.05, healthy)
+
+    def ranked(self) -> List[Route]:
+        """Routes by score, those with an open circuit last"""
+        return sorted(self.routes, key=lambda r: (not self.resilience.breaker(r.provider).available(), self._score(r)))
+
+    def hedge_delay(self, route: Route) -> float:
+        if len(route.samples) < self.min_samples:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, route.percentile(self.hedge_quantile))
+
+    def _inc(self, name: str, **labels) -> None:
+        if self.metrics:
+            self.metrics.inc(f"{ROUTED}_{name}_total", **labels)
+
+    async def call(self, send: Callable[[Route], Awaitable[T]]) -> Tuple[T, Route]:
+        """
+        Run `send(route)` on the best route, hedging on the next one when it
+        is slow and failing over when it errors. Returns the first answer and
+        the route that produced it; raises the last error if all routes fail.
+        """
+        candidates = iter(self.ranked())
+        primary = next(candidates)
+        running: Dict[asyncio.Task, Tuple[Route, float]] = {}
+
+        def launch(route: Route) -> None:
+            route.requests += 1
+            running[asyncio.ensure_future(send(route))] = (route, time.perf_counter())
+
+        self.requests += 1
+        self.hedges.deposit()
+        launch(primary)
+        hedge_at = time.perf_counter() + self.hedge_delay(primary)
+        may_hedge = True
+        hedge: Optional[Route] = None
+        error: Optional[BaseException] = None
+        try:
+            while running:
+                timeout = max(0.0, hedge_at - time.perf_counter()) if may_hedge else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    may_hedge = False
+                    alternate = next(candidates, None)
+                    if alternate and self.hedges.try_spend():
+                        self.hedged += 1
+                        self._inc("hedges", route=alternate.name)
+                        hedge = alternate
+                        launch(alternate)
+                    continue
+                for task in done:
+                    route, started = running.pop(task)
+                    if task.exception() is None:
+                        route.observe(time.perf_counter() - started, self.alpha)
+                        route.wins += 1
+                        if route is hedge:
+                            self.hedge_wins += 1
+                        self._inc("requests", route=route.name)
+                        return task.result(), route
+                    error = task.exception()
+                if not running:
+                    alternate = next(candidates, None)
+                    if alternate:
+                        may_hedge = False
+                        self.failovers += 1
+                        self._inc("failovers", route=alternate.name)
+                        launch(alternate)
+            raise error
+        finally:
+            for task, (route, started) in running.items():
+                task.cancel()
+                # The loser took at least this long, which is enough to demote it
+                route.observe(time.perf_counter() - started, self.alpha)
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "routes": {
+                route.name: {
+                    "ewma": route.ewma,
+                    "p95": route.percentile(0.95),
+                    "requests": route.requests,
+                    "wins": route.wins,
+                    "available": self.resilience.breaker(route.provider).available(),
+                }
+                for route in self.routes
+            },
+        }
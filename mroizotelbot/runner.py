@@ -0,0 +1,99 @@
+"""
+Event loop selection and the polling lifecycle.
+`run()` executes the bot's main coroutine on a fresh loop: the stdlib
+asyncio loop, or uvloop when BOT_LOOP=uvloop and it is installed.
+`serve_polling()` drives an Application through initialize/start/stop from
+inside that loop, so no nested event loop (nest_asyncio) is needed. Polled
+updates are processed concurrently across chats by ChatOrderedUpdateProcessor,
+which keeps each chat's updates in order like the webhook workers do.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional
+
+from telegram import Update
+from telegram.ext import Application, BaseUpdateProcessor
+
+from webhook import install_stop_signals
+
+LOOPS = ("asyncio", "uvloop")
+
+
+def loop_factory(kind: str = "asyncio") -> Optional[Callable[[], asyncio.AbstractEventLoop]]:
+    """Return a loop factory for `kind`; None means the stdlib default"""
+    if kind == "uvloop":
+        try:
+            import uvloop
+        except ImportError:
+            logging.warning("BOT_LOOP=uvloop but uvloop is not installed; using the asyncio loop")
+            return None
+        return uvloop.new_event_loop
+    if kind != "asyncio":
+        raise ValueError(f"Unknown event loop '{kind}' (choose from {', '.join(LOOPS)})")
+    return None
+
+
+def run(main: Coroutine, loop: str = "asyncio") -> Any:
+    """Run `main` to completion on a new event loop of the requested kind"""
+    with asyncio.Runner(loop_factory=loop_factory(loop)) as runner:
+        return runner.run(main)
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Up to `max_concurrent_updates` at once, but one at a time per chat"""
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._chats: Dict[int, asyncio.Lock] = {}
+        self._queued: Dict[int, int] = {}
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            await super().process_update(update, coroutine)
+            return
+        # Wait for the chat before taking a concurrency slot, so one busy chat cannot fill them all
+        lock = self._chats.setdefault(chat.id, asyncio.Lock())
+        self._queued[chat.id] = self._queued.get(chat.id, 0) + 1
+        try:
+            async with lock:
+                await super().process_update(update, coroutine)
+        finally:
+            self._queued[chat.id] -= 1
+            if not self._queued[chat.id]:
+                del self._queued[chat.id], self._chats[chat.id]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
+async def serve_polling(application: Application, stop_event: Optional[asyncio.Event] = None,
+                        poll_timeout: int = 10, drop_pending_updates: bool = False) -> None:
+    """Run the application with long polling until stopped"""
+    stop_event = stop_event or install_stop_signals(asyncio.Event())
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    try:
+        await application.updater.start_polling(
+            timeout=poll_timeout,
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=drop_pending_updates
+        )
+        await application.start()
+        await stop_event.wait()
+    finally:
+        if application.updater.running:
+            await application.updater.stop()
+        if application.running:
+            await application.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
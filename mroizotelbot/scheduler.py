@@ -0,0 +1,147 @@
+"""
+Central scheduler for auto-comment jobs.
+All subreddits live in one min-heap keyed by next run time. A single loop
+sleeps until the earliest job is due, then hands every job that is due
+(within a small coalescing window) to one cycle callback.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class AutoCommentJob:
+    """State of one scheduled subreddit"""
+    subreddit: str
+    interval: float
+    jitter: float
+    next_run: float
+    last_run: Optional[float] = None
+    runs: int = 0
+    last_error: Optional[str] = None
+    generation: int = 0
+
+
+class AutoCommentScheduler:
+    """Single-loop, heap-based scheduler for per-subreddit jobs"""
+
+    def __init__(self, run_cycle: Callable[[List[str]], Awaitable[Dict[str, Optional[str]]]],
+                 coalesce_window: float = 5.0):
+        self.run_cycle = run_cycle
+        self.coalesce_window = coalesce_window
+        self._jobs: Dict[str, AutoCommentJob] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(subreddit: str) -> str:
+        return subreddit.lower()
+
+    def _push(self, job: AutoCommentJob) -> None:
+        # A fresh generation per push invalidates any older heap entry for the job
+        job.generation = next(self._seq)
+        heapq.heappush(self._heap, (job.next_run, job.generation, self._key(job.subreddit)))
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _next_delay(self, job: AutoCommentJob) -> float:
+        return max(1.0, job.interval + random.uniform(-job.jitter, job.jitter))
+
+    def add(self, subreddit: str, interval: float, jitter: float = 0.0, run_now: bool = True) -> bool:
+        """Schedule a subreddit; returns False if it was already scheduled (interval is updated)"""
+        key = self._key(subreddit)
+        existing = self._jobs.get(key)
+        if existing:
+            existing.interval, existing.jitter = interval, jitter
+            if existing.last_run is not None:
+                # Re-time the pending run from the last one under the new interval
+                existing.next_run = max(time.monotonic(), existing.last_run + interval)
+                self._push(existing)
+            return False
+        first_run = time.monotonic() if run_now else time.monotonic() + interval
+        job = AutoCommentJob(subreddit=subreddit, interval=interval, jitter=jitter, next_run=first_run)
+        self._jobs[key] = job
+        self._push(job)
+        return True
+
+    def remove(self, subreddit: str) -> bool:
+        """Unschedule a subreddit; its heap entry is dropped lazily"""
+        return self._jobs.pop(self._key(subreddit), None) is not None
+
+    def jobs(self) -> List[AutoCommentJob]:
+        """Return scheduled jobs ordered by next run"""
+        return sorted(self._jobs.values(), key=lambda job: job.next_run)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _is_live(self, generation: int, key: str) -> bool:
+        job = self._jobs.get(key)
+        return job is not None and job.generation == generation
+
+    def _pop_due(self, now: float) -> List[AutoCommentJob]:
+        """Pop every live job due before now + coalesce_window"""
+        due = []
+        while self._heap and self._heap[0][0] <= now + self.coalesce_window:
+            _, generation, key = heapq.heappop(self._heap)
+            if self._is_live(generation, key):
+                due.append(self._jobs[key])
+        return due
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            # Drop stale heads left behind by remove()
+            while self._heap and not self._is_live(self._heap[0][1], self._heap[0][2]):
+                heapq.heappop(self._heap)
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            delay = self._heap[0][0] - now
+            if delay > 0:
+                # asyncio.timeout rather than wait_for: wait_for can swallow a
+                # cancellation that lands together with a wakeup, hanging stop()
+                try:
+                    async with asyncio.timeout(delay):
+                        await self._wakeup.wait()
+                    continue
+                except TimeoutError:
+                    pass
+
+            due = self._pop_due(time.monotonic())
+            if not due:
+                continue
+            try:
+                errors = await self.run_cycle([job.subreddit for job in due]) or {}
+            except Exception as e:
+                logging.error(f"Auto-comment cycle failed: {str(e)}")
+                errors = {job.subreddit: str(e) for job in due}
+
+            now = time.monotonic()
+            for job in due:
+                if self._jobs.get(self._key(job.subreddit)) is not job:
+                    continue
+                job.runs += 1
+                job.last_run = now
+                job.last_error = errors.get(job.subreddit)
+                job.next_run = now + self._next_delay(job)
+                self._push(job)
@@ -0,0 +1,65 @@
+"""
+Persistent index of Reddit submissions the bot has already handled.
+Backed by SQLite so it survives restarts; each subreddit keeps at most
+`max_per_subreddit` entries, oldest dropped first.
+"""
+import sqlite3
+import threading
+import time
+
+
+class SeenPostIndex:
+    """Per-subreddit set of processed submission ids with hit/miss counters"""
+
+    def __init__(self, path: str = "seen_posts.db", max_per_subreddit: int = 1000):
+        self.path = path
+        self.max_per_subreddit = max_per_subreddit
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_posts ("
+            " subreddit TEXT NOT NULL,"
+            " post_id TEXT NOT NULL,"
+            " seen_at REAL NOT NULL,"
+            " PRIMARY KEY (subreddit, post_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS seen_posts_age ON seen_posts (subreddit, seen_at)")
+        self._conn.commit()
+
+    def seen(self, subreddit: str, post_id: str) -> bool:
+        """Return True if the post was already processed, updating counters"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM seen_posts WHERE subreddit = ? AND post_id = ?",
+                (subreddit.lower(), post_id)
+            ).fetchone()
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return row is not None
+
+    def add(self, subreddit: str, post_id: str) -> None:
+        """Record a processed post and trim the subreddit to its size bound"""
+        key = subreddit.lower()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO seen_posts (subreddit, post_id, seen_at) VALUES (?, ?, ?)",
+                (key, post_id, time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM seen_posts WHERE subreddit = ? AND post_id NOT IN ("
+                " SELECT post_id FROM seen_posts WHERE subreddit = ? ORDER BY seen_at DESC LIMIT ?)",
+                (key, key, self.max_per_subreddit)
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,24 @@
+"""
+Helpers for helper processes started with the "spawn" method.
+A spawned child re-runs the parent's __main__ script before it takes any
+work. Pool workers that only need a library module (translation, Vosk)
+should not re-import the whole bot (SQLite indexes, caches, thread pools),
+so the script path is hidden while they start.
+"""
+import sys
+from contextlib import contextmanager
+
+
+@contextmanager
+def spawn_without_main():
+    """Hide __main__.__file__ while processes are spawned inside the block"""
+    main = sys.modules.get("__main__")
+    path = getattr(main, "__file__", None)
+    if path is None:
+        yield
+        return
+    del main.__file__
+    try:
+        yield
+    finally:
+        main.__file__ = path
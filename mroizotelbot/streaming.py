@@ -0,0 +1,151 @@
+"""
+Streaming replies for chat completions.
+Reads an OpenAI-style SSE stream (OpenRouter, DeepSeek) and progressively
+edits one Telegram message as tokens arrive. Edits are coalesced to stay
+under Telegram's per-chat edit rate limit. HTTP errors are raised before
+anything is sent; failures after the first token raise StreamInterrupted
+so callers do not retry into a duplicate message.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Optional
+
+import aiohttp
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+
+class StreamInterrupted(Exception):
+    """The upstream stream failed after part of the answer was already shown"""
+
+
+def _delta_text(event: dict) -> str:
+    """Extract the text fragment from one SSE event payload"""
+    choices = event.get("choices")
+    if choices:
+        choice = choices[0]
+        delta = choice.get("delta") or choice.get("message") or {}
+        return delta.get("content") or choice.get("text") or ""
+    return event.get("answer") or event.get("delta") or ""
+
+
+async def iter_sse_deltas(response: aiohttp.ClientResponse) -> AsyncIterator[str]:
+    """Yield content deltas from a `data: {...}` event stream until [DONE]"""
+    buffer = b""
+    async for chunk in response.content.iter_any():
+        buffer += chunk
+        while b"\n" in buffer:
+            raw, buffer = buffer.split(b"\n", 1)
+            line = raw.strip()
+            if not line.startswith(b"data:"):
+                continue  # blank separators and ": keep-alive" comments
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                return
+            try:
+                text = _delta_text(json.loads(data))
+            except (ValueError, AttributeError):
+                continue
+            if text:
+                yield text
+
+
+class MessageStreamer:
+    """Coalesce streamed text into throttled Telegram message edits"""
+
+    def __init__(self, reply_to: Message, min_interval: float = 1.0, min_chars: int = 40,
+                 placeholder: str = "…"):
+        self.reply_to = reply_to
+        self.min_interval = min_interval
+        self.min_chars = min_chars
+        self.placeholder = placeholder
+        self.text = ""
+        self.full_text = ""
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self._message: Optional[Message] = None
+        self._sent_text = ""
+        self._last_edit = 0.0
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    async def push(self, fragment: str) -> None:
+        """Append a fragment and edit the message if enough time/text has accumulated"""
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.text += fragment
+        self.full_text += fragment
+        if len(self.text) > TELEGRAM_MESSAGE_LIMIT:
+            await self._roll_over()
+        due = time.perf_counter() - self._last_edit >= self.min_interval
+        if self._message is None or (due and len(self.text) - len(self._sent_text) >= self.min_chars):
+            await self._render(self.text + " " + self.placeholder)
+
+    async def finish(self, fallback: str = "⚠️ No response") -> str:
+        """Flush the final text; returns the full streamed text"""
+        await self._render(self.text or fallback)
+        return self.full_text
+
+    async def _roll_over(self) -> None:
+        """Freeze a full message and continue streaming in a new one"""
+        head, self.text = self.text[:TELEGRAM_MESSAGE_LIMIT], self.text[TELEGRAM_MESSAGE_LIMIT:]
+        await self._render(head)
+        self._message = None
+        self._sent_text = ""
+
+    async def _render(self, text: str) -> None:
+        text = text[:TELEGRAM_MESSAGE_LIMIT]
+        if text == self._sent_text:
+            return
+        while True:
+            try:
+                if self._message is None:
+                    self._message = await self.reply_to.reply_text(text)
+                else:
+                    await self._message.edit_text(text)
+                break
+            except RetryAfter as e:
+                retry = e.retry_after
+                await asyncio.sleep(retry.total_seconds() if hasattr(retry, "total_seconds") else retry)
+            except BadRequest as e:
+                if "not modified" not in str(e).lower():
+                    raise
+                break
+        self._sent_text = text
+        self._last_edit = time.perf_counter()
+
+
+async def stream_reply(session: aiohttp.ClientSession, url: str, headers: dict, payload: dict,
+                       reply_to: Message, label: str, min_interval: float = 1.0) -> str:
+    """POST a streaming completion and mirror it into a Telegram reply"""
+    streamer = MessageStreamer(reply_to, min_interval=min_interval)
+    # No total limit: a long answer may stream past the session's total timeout. The
+    # caller's deadline bounds the whole reply; here only a stalled stream times out.
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=session.timeout.sock_connect,
+                                    sock_read=session.timeout.sock_read)
+    async with session.post(url, headers=headers, json={**payload, "stream": True}, timeout=timeout) as response:
+        response.raise_for_status()
+        try:
+            if "text/event-stream" in response.headers.get("Content-Type", ""):
+                async for fragment in iter_sse_deltas(response):
+                    await streamer.push(fragment)
+            else:
+                # Provider ignored stream=true; fall back to a single JSON body
+                data = await response.json(content_type=None)
+                await streamer.push(_delta_text(data))
+        except aiohttp.ClientError as e:
+            if streamer.first_token_at is not None:
+                raise StreamInterrupted(f"stream broke off after {len(streamer.full_text)} characters") from e
+            raise
+    text = await streamer.finish()
+    if streamer.time_to_first_token is not None:
+        logging.info(f"⚡ {label} first token in {streamer.time_to_first_token:.2f}s")
+    return text
@@ -0,0 +1,281 @@
+"""
+Speech-to-text backends.
+Every backend implements `transcribe(voice)`; a registry picks one by name
+or by latency policy. The offline Vosk backend keeps its model loaded in a
+long-lived worker process, and the stub backend needs no network at all.
+Uploads stream the Telegram download straight through in fixed-size chunks.
+"""
+import abc
+import asyncio
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+
+from audio import VoicePipeline
+from spawning import spawn_without_main
+
+
+async def telegram_file_chunks(session: aiohttp.ClientSession, file_path: str,
+                               chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Stream a Telegram file (download URL or local Bot API path) in chunks"""
+    if not file_path.startswith(("http://", "https://")):
+        with open(file_path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+        return
+    async with session.get(file_path) as response:
+        response.raise_for_status()
+        async for chunk in response.content.iter_chunked(chunk_size):
+            yield chunk
+
+
+@dataclass
+class VoiceInput:
+    """
+    A voice note to transcribe. `read()` downloads and keeps the whole file;
+    `stream()` yields it chunk by chunk straight from the download without
+    keeping a copy (nothing replays a streamed upload).
+    """
+    loader: Callable[[], Awaitable[bytes]]
+    duration: Optional[float] = None
+    file_size: Optional[int] = None
+    language: str = "en-US"
+    chunks: Optional[Callable[[], AsyncIterator[bytes]]] = None
+    chunk_size: int = 64 * 1024
+    _data: Optional[bytes] = field(default=None, repr=False)
+
+    async def read(self) -> bytes:
+        if self._data is None:
+            self._data = bytes(await self.loader())
+        return self._data
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        if self._data is None and self.chunks is not None:
+            async for chunk in self.chunks():
+                yield chunk
+            return
+        data = await self.read()
+        for offset in range(0, len(data), self.chunk_size):
+            yield data[offset:offset + self.chunk_size]
+
+
+class SpeechBackend(abc.ABC):
+    """Base class; subclasses implement `_transcribe`"""
+    name = "base"
+    needs_network = True
+
+    def __init__(self, ewma_alpha: float = 0.3, max_failures: int = 3, cool_down: float = 30.0):
+        self.ewma_alpha = ewma_alpha
+        self.max_failures = max_failures
+        self.cool_down = cool_down
+        self.latency: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.failed_at = 0.0
+
+    async def transcribe(self, voice: VoiceInput) -> str:
+        started = time.perf_counter()
+        try:
+            text = await self._transcribe(voice)
+        except Exception:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.failed_at = time.monotonic()
+            raise
+        elapsed = time.perf_counter() - started
+        self.calls += 1
+        self.consecutive_failures = 0
+        self.latency = elapsed if self.latency is None else (
+            self.ewma_alpha * elapsed + (1 - self.ewma_alpha) * self.latency
+        )
+        return text
+
+    @abc.abstractmethod
+    async def _transcribe(self, voice: VoiceInput) -> str:
+        """Return the transcription of `voice`"""
+
+    @property
+    def retry_in(self) -> float:
+        """Seconds until an unhealthy backend gets a trial request again"""
+        return max(0.0, self.failed_at + self.cool_down - time.monotonic())
+
+    @property
+    def healthy(self) -> bool:
+        """
+        False after `max_failures` failures in a row, until `cool_down` has
+        passed; then one trial request decides (a success resets the count,
+        a failure starts another cool-down).
+        """
+        return self.consecutive_failures < self.max_failures or not self.retry_in
+
+    def shutdown(self) -> None:
+        pass
+
+
+class GoogleBackend(SpeechBackend):
+    """Decode with ffmpeg, recognize with Google Web Speech on a thread"""
+    name = "google"
+
+    def __init__(self, pipeline: VoicePipeline):
+        super().__init__()
+        self.pipeline = pipeline
+
+    async def _transcribe(self, voice: VoiceInput) -> str:
+        audio = await self.pipeline.decode(await voice.read())
+        return await self.pipeline.recognize_google(audio, voice.language)
+
+
+class OpenRouterBackend(SpeechBackend):
+    """Stream the OGG note to OpenRouter's voice-to-text endpoint as multipart"""
+    name = "openrouter"
+
+    def __init__(self, session_factory: Callable[[], aiohttp.ClientSession], api_key: Optional[str],
+                 url: str = "https://openrouter.ai/api/v1/voice-to-text"):
+        super().__init__()
+        self.session_factory = session_factory
+        self.api_key = api_key
+        self.url = url
+
+    async def _transcribe(self, voice: VoiceInput) -> str:
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        form = aiohttp.FormData()
+        form.add_field("file", voice.stream(), filename="voice.ogg", content_type="audio/ogg")
+        async with self.session_factory().post(self.url, headers=headers, data=form) as response:
+            data = await response.json()
+            if "text" not in data:
+                raise RuntimeError(f"OpenRouter returned no transcription ({response.status})")
+            return data["text"]
+
+
+# Per-process state for the Vosk worker
+_vosk_model = None
+
+
+def _init_vosk(model_path: str) -> None:
+    global _vosk_model
+    from vosk import Model, SetLogLevel
+    SetLogLevel(-1)
+    _vosk_model = Model(model_path)
+
+
+def _vosk_ready() -> bool:
+    return _vosk_model is not None
+
+
+def _vosk_transcribe(pcm: bytes, sample_rate: int) -> str:
+    from vosk import KaldiRecognizer
+    recognizer = KaldiRecognizer(_vosk_model, sample_rate)
+    recognizer.AcceptWaveform(pcm)
+    return json.loads(recognizer.FinalResult()).get("text", "")
+
+
+class VoskBackend(SpeechBackend):
+    """Offline recognition in a long-lived worker process with the model loaded once"""
+    name = "vosk"
+    needs_network = False
+
+    def __init__(self, pipeline: VoicePipeline, model_path: str):
+        super().__init__()
+        self.pipeline = pipeline
+        self.model_path = model_path
+        self._worker: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._worker = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_vosk,
+                initargs=(self.model_path,)
+            )
+            # Spawn the worker and load the model now rather than on the first request
+            with spawn_without_main():
+                self._worker.submit(_vosk_ready)
+
+    async def _transcribe(self, voice: VoiceInput) -> str:
+        audio = await self.pipeline.decode(await voice.read())
+        self.start()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._worker, _vosk_transcribe, audio.frame_data, audio.sample_rate)
+        except BrokenProcessPool:
+            # The worker died; replace it so the next request gets a fresh one
+            self._worker = None
+            raise
+
+    def shutdown(self) -> None:
+        if self._worker:
+            self._worker.shutdown(wait=False, cancel_futures=True)
+            self._worker = None
+
+
+class StubBackend(SpeechBackend):
+    """Deterministic local backend for tests and offline development"""
+    name = "stub"
+    needs_network = False
+
+    def __init__(self, text: str = "stub transcription", delay: float = 0.0):
+        super().__init__()
+        self.text = text
+        self.delay = delay
+
+    async def _transcribe(self, voice: VoiceInput) -> str:
+        data = await voice.read()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return f"{self.text} ({len(data)} bytes)"
+
+
+class SpeechBackends:
+    """Registry of speech backends with name and latency-policy selection"""
+
+    def __init__(self, default: str = "google"):
+        self.default = default
+        self._backends: Dict[str, SpeechBackend] = {}
+
+    def register(self, backend: SpeechBackend) -> None:
+        self._backends[backend.name] = backend
+
+    def names(self) -> List[str]:
+        return list(self._backends)
+
+    def all(self) -> List[SpeechBackend]:
+        return list(self._backends.values())
+
+    def choose(self, name: Optional[str] = None) -> SpeechBackend:
+        """
+        Resolve a backend: an explicit name, "auto" (lowest recent latency
+        among healthy backends, untried ones first) or "local" (prefer
+        backends that need no network; KeyError if none is registered or
+        all of them are cooling down after failures).
+        """
+        name = (name or self.default).lower()
+        if name in self._backends:
+            return self._backends[name]
+        candidates = [b for b in self._backends.values() if b.healthy and b.name != "stub"] or self.all()
+        if not candidates:
+            raise KeyError("No speech backends registered")
+        if name == "local":
+            candidates = [b for b in candidates if not b.needs_network]
+            if not candidates:
+                offline = [b for b in self._backends.values() if not b.needs_network and b.name != "stub"]
+                if not offline:
+                    raise KeyError("No offline speech backend is registered (set VOSK_MODEL_PATH)")
+                raise KeyError(", ".join(
+                    f"{b.name} failed {b.consecutive_failures} times in a row; retrying in {b.retry_in:.0f}s"
+                    for b in offline
+                ))
+        elif name != "auto":
+            raise KeyError(f"Unknown speech backend '{name}' (available: {', '.join(self._backends)}, auto, local)")
+        return min(candidates, key=lambda b: b.latency if b.latency is not None else -1.0)
+
+    def shutdown(self) -> None:
+        for backend in self._backends.values():
+            backend.shutdown()
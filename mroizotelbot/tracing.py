@@ -0,0 +1,175 @@
+"""
+Lightweight per-update tracing.
+Each handled update gets a root span; code underneath opens child spans
+with `span(name)`, which is a no-op outside a traced update. Finished
+traces go into a bounded ring buffer so the slowest recent ones can be
+inspected. Bot API calls are traced by TracedRequest, and a sampling
+profiler can be switched on at runtime.
+"""
+import contextvars
+import functools
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Deque, List, Optional
+
+from telegram.request import HTTPXRequest
+
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed operation with nested children"""
+    __slots__ = ("name", "attrs", "start", "end", "children", "error")
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def format(self, depth: int = 0, min_duration: float = 0.0) -> List[str]:
+        """Indented breakdown; children shorter than min_duration are folded"""
+        suffix = f" ❗{self.error}" if self.error else ""
+        lines = [f"{'  ' * depth}{self.name} {self.duration * 1000:.0f}ms{suffix}"]
+        folded = 0
+        for child in self.children:
+            if child.duration < min_duration and not child.error:
+                folded += 1
+            else:
+                lines.extend(child.format(depth + 1, min_duration))
+        if folded:
+            lines.append(f"{'  ' * (depth + 1)}… {folded} short spans")
+        return lines
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Record a child span of the current trace (no-op when not tracing)"""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, **attrs)
+    parent.children.append(child)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current.reset(token)
+
+
+class Tracer:
+    """Root spans per update, kept in a ring buffer of recent traces"""
+
+    def __init__(self, capacity: int = 500):
+        self.traces: Deque[Span] = deque(maxlen=capacity)
+        self.finished_at: Deque[float] = deque(maxlen=capacity)
+
+    def trace(self, handler: Callable[..., Awaitable[None]], name: str):
+        """Wrap a Telegram handler so each update it handles is traced"""
+        @functools.wraps(handler)
+        async def wrapper(update, context):
+            root = Span(
+                name,
+                update_id=update.update_id,
+                chat_id=update.effective_chat.id if update.effective_chat else None,
+                user_id=update.effective_user.id if update.effective_user else None,
+            )
+            token = _current.set(root)
+            try:
+                await handler(update, context)
+            except BaseException as e:
+                root.error = type(e).__name__
+                raise
+            finally:
+                root.end = time.perf_counter()
+                _current.reset(token)
+                self.traces.append(root)
+                self.finished_at.append(time.time())
+        return wrapper
+
+    def slowest(self, count: int = 5) -> List[tuple]:
+        """(finished_at, root span) pairs for the slowest recent updates"""
+        return sorted(zip(self.finished_at, self.traces), key=lambda item: item[1].duration, reverse=True)[:count]
+
+
+class TracedRequest(HTTPXRequest):
+    """HTTPXRequest that records each Bot API call as a span"""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        name = "telegram.download" if "/file/bot" in url else f"telegram.{url.rsplit('/', 1)[-1]}"
+        with span(name):
+            return await super().do_request(url, method, *args, **kwargs)
+
+
+class SamplingProfiler:
+    """Periodically sample one thread's stack and count the frames seen"""
+
+    def __init__(self, interval: float = 0.005, depth: int = 3):
+        self.interval = interval
+        self.depth = depth
+        self.samples = 0
+        self.idle = 0
+        self.stacks: Counter = Counter()
+        self._target: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, thread_id: Optional[int] = None) -> None:
+        """Start sampling `thread_id` (default: the calling thread)"""
+        if self.running:
+            return
+        self._target = thread_id or threading.get_ident()
+        self.samples = 0
+        self.idle = 0
+        self.stacks.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            self.samples += 1
+            if frame.f_code.co_name == "select" and frame.f_code.co_filename.endswith("selectors.py"):
+                self.idle += 1  # event loop waiting for I/O
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[" ← ".join(stack)] += 1
+
+    def report(self, top: int = 15) -> List[str]:
+        """Most frequently sampled stacks with their share of samples"""
+        if not self.samples:
+            return []
+        lines = [f"{self.idle / self.samples:5.1%} idle (waiting for I/O)"]
+        lines += [f"{count / self.samples:5.1%} {stack}" for stack, count in self.stacks.most_common(top)]
+        return lines
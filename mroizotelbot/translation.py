@@ -0,0 +1,367 @@
+"""
+Argos Translate helpers.
+Ready translation objects are cached per (src, dest) pair so repeat
+translations skip language discovery and model setup entirely. Inference
+runs in a pool of worker processes that each keep their own warm cache.
+argostranslate is imported where it is used, so only processes that
+actually translate or install pay for loading it.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from spawning import spawn_without_main
+
+
+class TranslationCache:
+    """Process-wide cache of Argos translation objects keyed by (src, dest)"""
+
+    def __init__(self):
+        self._translations: Dict[Tuple[str, str], object] = {}
+        self._lock = threading.Lock()
+
+    def get(self, src: str, dest: str):
+        """Return a ready translation for the pair, or None if it is not installed"""
+        key = (src, dest)
+        translation = self._translations.get(key)
+        if translation is not None:
+            return translation
+        with self._lock:
+            translation = self._translations.get(key)
+            if translation is None:
+                translation = self._build(src, dest)
+                if translation is not None:
+                    self._translations[key] = translation
+            return translation
+
+    @staticmethod
+    def _build(src: str, dest: str):
+        import argostranslate.translate
+        installed_languages = argostranslate.translate.get_installed_languages()
+        from_lang = next((lang for lang in installed_languages if lang.code == src), None)
+        to_lang = next((lang for lang in installed_languages if lang.code == dest), None)
+        if from_lang and to_lang:
+            return from_lang.get_translation(to_lang)
+        return None
+
+    def preload(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        """Build translations for configured pairs ahead of the first request"""
+        for src, dest in pairs:
+            if self.get(src, dest) is None:
+                logging.warning(f"Translation pair {src}->{dest} is not installed; skipping preload")
+            else:
+                logging.info(f"🌍 Preloaded translation {src}->{dest}")
+
+    def invalidate(self) -> None:
+        """Drop cached objects, e.g. after a new language package is installed"""
+        with self._lock:
+            self._translations.clear()
+
+
+def parse_pairs(spec: Optional[str]) -> list:
+    """Parse "en:fa,fa:en" into [("en", "fa"), ("fa", "en")]"""
+    pairs = []
+    for item in (spec or "").split(","):
+        if ":" in item:
+            src, dest = item.strip().split(":", 1)
+            pairs.append((src.strip(), dest.strip()))
+    return pairs
+
+
+class TranslationBusy(Exception):
+    """Raised when the translation queue is full"""
+
+
+# Per-process state for pool workers
+_worker_cache: Optional[TranslationCache] = None
+_worker_generation = 0
+
+
+def _init_worker(pairs: List[Tuple[str, str]]) -> None:
+    global _worker_cache
+    _worker_cache = TranslationCache()
+    _worker_cache.preload(pairs)
+
+
+def _warm_up() -> int:
+    """No-op job; submitting one per worker makes the pool start them all now"""
+    return os.getpid()
+
+
+def _translate_batch(cache: TranslationCache, src: str, dest: str, texts: List[str]) -> Optional[List[str]]:
+    translation = cache.get(src, dest)
+    return [translation.translate(text) for text in texts] if translation else None
+
+
+def _translate_in_worker(src: str, dest: str, texts: List[str], generation: int) -> Optional[List[str]]:
+    """Translate a batch with the worker's warm cache; None means the pair is not installed"""
+    global _worker_generation
+    if generation != _worker_generation:
+        # A package was installed since this worker last looked
+        _worker_cache.invalidate()
+        _worker_generation = generation
+    return _translate_batch(_worker_cache, src, dest, texts)
+
+
+class TranslationPool:
+    """
+    Bounded front-end for CPU-bound Argos inference.
+    With workers > 0 translations run in separate processes (one model copy
+    each); with workers == 0 they run on a single thread in this process.
+    """
+
+    def __init__(self, workers: int = 2, pairs: Optional[List[Tuple[str, str]]] = None,
+                 max_queue: int = 32, timeout: float = 60.0):
+        self.workers = workers
+        self.pairs = pairs or []
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.local = TranslationCache()
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._generation = 0
+
+    def start(self) -> None:
+        """Create the pool and start every worker now, so preloading happens at startup"""
+        if self._executor:
+            return
+        if self.workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.pairs,)
+            )
+            # The pool spawns a worker per submitted job while none is idle
+            with spawn_without_main():
+                for _ in range(self.workers):
+                    self._executor.submit(_warm_up).add_done_callback(self._log_ready)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="argos",
+                                                initializer=self.local.preload, initargs=(self.pairs,))
+
+    @staticmethod
+    def _log_ready(future: Future) -> None:
+        if future.cancelled():
+            return
+        if future.exception():
+            logging.error(f"Translation worker failed to start: {str(future.exception())}")
+        else:
+            logging.info(f"🌍 Translation worker {future.result()} ready")
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, count: int) -> None:
+        with self._pending_lock:
+            self._pending -= count
+
+    async def translate(self, src: str, dest: str, text: str) -> Optional[str]:
+        """Translate text; returns None if the pair is not installed"""
+        results = await self.translate_batch(src, dest, [text])
+        return results[0] if results else None
+
+    async def translate_batch(self, src: str, dest: str, texts: List[str]) -> Optional[List[str]]:
+        """Translate several texts for one pair, split into one job per worker"""
+        if self._executor is None:
+            self.start()
+        with self._pending_lock:
+            if self._pending + len(texts) > max(1, self.workers) + self.max_queue:
+                raise TranslationBusy(f"{self._pending} translations already queued")
+            self._pending += len(texts)
+        # Argos translates a job's texts one after another, so spread them over the workers
+        size = -(-len(texts) // max(1, self.workers))
+        executor = self._executor
+        jobs = []
+        submitted = 0
+        try:
+            for start in range(0, len(texts), size):
+                chunk = texts[start:start + size]
+                if self.workers > 0:
+                    job = executor.submit(_translate_in_worker, src, dest, chunk, self._generation)
+                else:
+                    job = executor.submit(_translate_batch, self.local, src, dest, chunk)
+                # Released when the job really ends: a timed-out job still occupies its worker
+                job.add_done_callback(lambda _, count=len(chunk): self._release(count))
+                jobs.append(job)
+                submitted += len(chunk)
+            results = await asyncio.wait_for(
+                asyncio.gather(*(asyncio.wrap_future(job) for job in jobs)), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            for job in jobs:
+                job.cancel()  # only succeeds while the job is still queued
+            raise
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise
+        finally:
+            if submitted < len(texts):
+                self._release(len(texts) - submitted)  # submit() failed; these never got a job
+        if any(result is None for result in results):
+            return None
+        return [text for result in results for text in result]
+
+    def _restart(self, broken: Executor) -> None:
+        """Replace a pool whose worker died (OOM, CTranslate2 crash) and warm the new one up"""
+        if self._executor is not broken:
+            return  # another request already replaced it
+        logging.error("💥 A translation worker died; restarting the translation pool")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self.start()
+
+    def invalidate(self) -> None:
+        """Make every worker rebuild its translations on its next job"""
+        self._generation += 1
+        self.local.invalidate()
+
+    def shutdown(self) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class TranslationBatcher:
+    """
+    Collect concurrent requests for the same (src, dest) pair for up to
+    `max_wait` seconds or `max_batch` items, hand them to the pool as one
+    batch (spread over its workers) and fan the results back out.
+    """
+
+    def __init__(self, pool: TranslationPool, max_batch: int = 8, max_wait: float = 0.02):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+        self.total_wait = 0.0
+        self.largest_batch = 0
+        self._queues: Dict[Tuple[str, str], List[Tuple[str, float, asyncio.Future]]] = {}
+        self._timers: Dict[Tuple[str, str], asyncio.TimerHandle] = {}
+
+    async def translate(self, src: str, dest: str, text: str) -> Optional[str]:
+        if self.max_batch <= 1:
+            return await self.pool.translate(src, dest, text)
+        key = (src, dest)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._queues.setdefault(key, [])
+        queue.append((text, time.perf_counter(), future))
+        if len(queue) >= self.max_batch:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+        return await future
+
+    def _flush(self, key: Tuple[str, str]) -> None:
+        timer = self._timers.pop(key, None)
+        if timer:
+            timer.cancel()
+        batch = self._queues.pop(key, [])
+        if batch:
+            asyncio.get_running_loop().create_task(self._run(key, batch))
+
+    async def _run(self, key: Tuple[str, str], batch: List[Tuple[str, float, asyncio.Future]]) -> None:
+        now = time.perf_counter()
+        self.batches += 1
+        self.requests += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.total_wait += sum(now - queued_at for _, queued_at, _ in batch)
+        try:
+            results = await self.pool.translate_batch(key[0], key[1], [text for text, _, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for index, (_, _, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(results[index] if results else None)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch": self.requests / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "avg_wait_ms": self.total_wait / self.requests * 1000 if self.requests else 0.0,
+        }
+
+
+class PackageManager:
+    """
+    Argos package installs off the event loop.
+    The remote package index is refreshed at most once per `index_ttl`
+    (judged by the mtime of Argos' on-disk index), and concurrent installs
+    of the same pair share one job.
+    """
+
+    def __init__(self, index_ttl: float = 86400.0, max_workers: int = 2):
+        self.index_ttl = index_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="argos-install")
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._index_lock = threading.Lock()
+        self._index_loaded_at = 0.0
+
+    def _index_path(self) -> Optional[str]:
+        import argostranslate.package
+        settings = getattr(argostranslate, "settings", None)
+        path = getattr(settings, "local_package_index", None)
+        return str(path) if path else None
+
+    def _refresh_index(self) -> None:
+        """Download the package index unless the cached copy is still fresh"""
+        with self._index_lock:
+            path = self._index_path()
+            if path and os.path.exists(path):
+                fetched_at = os.path.getmtime(path)
+            else:
+                fetched_at = self._index_loaded_at
+            if time.time() - fetched_at < self.index_ttl:
+                return
+            import argostranslate.package
+            argostranslate.package.update_package_index()
+            self._index_loaded_at = time.time()
+
+    def _install_blocking(self, src: str, dest: str) -> str:
+        """Install a pair; returns one of: installed, present, missing"""
+        import argostranslate.package
+        installed = argostranslate.package.get_installed_packages()
+        if any(pkg.from_code == src and pkg.to_code == dest for pkg in installed):
+            return "present"
+        self._refresh_index()
+        available_packages = argostranslate.package.get_available_packages()
+        package_to_install = next((pkg for pkg in available_packages if pkg.from_code == src and pkg.to_code == dest), None)
+        if package_to_install is None:
+            return "missing"
+        argostranslate.package.install_from_path(package_to_install.download())
+        return "installed"
+
+    async def install(self, src: str, dest: str) -> str:
+        """Install a pair, joining any in-flight install of the same pair"""
+        key = (src, dest)
+        pending = self._inflight.get(key)
+        if pending:
+            return await asyncio.shield(pending)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, self._install_blocking, src, dest)
+        self._inflight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._inflight.pop(key, None)
+            else:
+                future.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,203 @@
+"""
+Text-to-speech synthesis and caching.
+Long texts are split at sentence boundaries and synthesized concurrently on
+a thread pool, then stitched into one voice note. Level one of the cache
+keeps synthesized audio on disk keyed by a hash of (lang, text), evicting
+least-recently-used files beyond a size budget. Level two keeps the
+Telegram file_id from the first upload so repeats are resent by id.
+gTTS is imported by the first synthesis.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Callable, List, Optional
+
+from audio import VoicePipeline
+
+_SENTENCE_END = re.compile(r"(?<=[.!?;:\u061F\u06D4\u3002])\s+")
+
+
+def split_sentences(text: str, max_chars: int = 200) -> List[str]:
+    """Split text into chunks of whole sentences no longer than max_chars"""
+    chunks: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text.strip()):
+        # Sentences longer than a chunk are broken at word boundaries
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        chunks.append(current)
+    return [chunk for chunk in chunks if chunk]
+
+
+def gtts_synthesize(lang: str, text: str) -> bytes:
+    """Blocking gTTS call returning MP3 bytes"""
+    from gtts import gTTS
+    with BytesIO() as audio_buffer:
+        gTTS(text, lang=lang).write_to_fp(audio_buffer)
+        return audio_buffer.getvalue()
+
+
+class ChunkedSynthesizer:
+    """Synthesize sentence chunks concurrently and stitch them in order"""
+
+    def __init__(self, max_concurrency: int = 4, chunk_chars: int = 200,
+                 pipeline: Optional[VoicePipeline] = None,
+                 synthesize: Callable[[str, str], bytes] = gtts_synthesize):
+        self.chunk_chars = chunk_chars
+        self.pipeline = pipeline
+        self.synthesize_chunk = synthesize
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="tts")
+
+    async def synthesize_mp3(self, lang: str, text: str) -> bytes:
+        """Return MP3 for the whole text; chunks run in parallel"""
+        loop = asyncio.get_running_loop()
+        chunks = split_sentences(text, self.chunk_chars) or [text]
+        parts = await asyncio.gather(
+            *(loop.run_in_executor(self._executor, self.synthesize_chunk, lang, chunk) for chunk in chunks)
+        )
+        # MP3 frames are self-delimiting, so in-order concatenation is a valid stream
+        return b"".join(parts)
+
+    async def synthesize(self, lang: str, text: str) -> bytes:
+        """Return a voice note: OGG/Opus when ffmpeg is available, MP3 otherwise"""
+        mp3 = await self.synthesize_mp3(lang, text)
+        if self.pipeline is None:
+            return mp3
+        try:
+            return await self.pipeline.encode_opus(mp3)
+        except (FileNotFoundError, RuntimeError):
+            return mp3
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class TTSCache:
+    """Disk-backed LRU of synthesized audio plus Telegram file_id reuse"""
+
+    def __init__(self, directory: str = "tts_cache", max_bytes: int = 200 * 1024 * 1024, suffix: str = ".audio"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.file_id_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "index.db"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tts_cache ("
+            " key TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL DEFAULT 0,"
+            " last_used REAL NOT NULL,"
+            " file_id TEXT)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key(lang: str, text: str) -> str:
+        return hashlib.sha256(f"{lang.lower()}\0{text.strip()}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get_file_id(self, key: str) -> Optional[str]:
+        """Return the Telegram file_id of a previous upload, if any"""
+        with self._lock:
+            row = self._conn.execute("SELECT file_id FROM tts_cache WHERE key = ?", (key,)).fetchone()
+            if row and row[0]:
+                self.file_id_hits += 1
+                self._conn.execute("UPDATE tts_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+                return row[0]
+            return None
+
+    def set_file_id(self, key: str, file_id: Optional[str]) -> None:
+        """Remember (or forget, with None) the file_id for an entry"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO tts_cache (key, last_used, file_id) VALUES (?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET file_id = excluded.file_id",
+                (key, time.time(), file_id)
+            )
+            self._conn.commit()
+
+    def get_audio(self, key: str) -> Optional[bytes]:
+        """Return cached audio bytes and mark the entry as recently used"""
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        with self._lock:
+            self.disk_hits += 1
+            self._conn.execute("UPDATE tts_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return data
+
+    def put_audio(self, key: str, data: bytes) -> None:
+        """Store audio and evict least-recently-used files over the size budget"""
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO tts_cache (key, size, last_used) VALUES (?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET size = excluded.size, last_used = excluded.last_used",
+                (key, len(data), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM tts_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM tts_cache WHERE size > 0 ORDER BY last_used").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            # Keep the row: a remembered file_id stays valid without local audio
+            self._conn.execute("UPDATE tts_cache SET size = 0 WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tts_cache WHERE size > 0"
+            ).fetchone()
+        return {
+            "file_id_hits": self.file_id_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "files": entries,
+            "bytes": total,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,162 @@
+"""
+Webhook serving mode.
+An embedded aiohttp server receives updates from Telegram, checks the
+secret token header and queues each update on a shard chosen by chat id.
+Each shard hands its updates, in arrival order, to the application's update
+processor, the same one polling uses (ChatOrderedUpdateProcessor in the bot),
+which runs different chats concurrently and each chat in order. At most
+`queue_size` updates are admitted at once; beyond that the endpoint answers
+503 and Telegram redelivers. With a `dispatch` callback the raw update is
+handed off instead (multi-process mode).
+"""
+import asyncio
+import hmac
+import logging
+import signal
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Set
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+
+@dataclass
+class WebhookSettings:
+    """Webhook server configuration"""
+    url: Optional[str] = None  # public URL registered with Telegram; None skips set_webhook
+    listen: str = "0.0.0.0"
+    port: int = 8443
+    path: str = "/telegram"
+    secret_token: Optional[str] = None
+    workers: int = 4  # ingress shards; handler concurrency is the update processor's
+    queue_size: int = 1000
+    max_connections: int = 40
+    drop_pending_updates: bool = False
+
+
+class WebhookServer:
+    """aiohttp endpoint feeding chat-sharded queues into the update processor"""
+
+    def __init__(self, application: Optional[Application], settings: WebhookSettings,
+                 dispatch: Optional[Callable[[dict], bool]] = None):
+        self.application = application
+        self.settings = settings
+        self.dispatch = dispatch
+        self.received = 0
+        self.rejected = 0
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self._running: Set[asyncio.Task] = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> None:
+        self._slots = asyncio.Semaphore(max(1, self.settings.queue_size))
+        for index in range(0 if self.dispatch else max(1, self.settings.workers)):
+            queue = asyncio.Queue(maxsize=max(1, self.settings.queue_size // max(1, self.settings.workers)))
+            self._queues.append(queue)
+            self._workers.append(asyncio.get_running_loop().create_task(self._work(queue), name=f"webhook-{index}"))
+        app = web.Application()
+        app.router.add_post(self.settings.path, self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.settings.listen, self.settings.port).start()
+        logging.info(f"🪝 Webhook listening on {self.settings.listen}:{self.settings.port}{self.settings.path}")
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await asyncio.gather(*self._running, return_exceptions=True)  # let admitted updates finish
+        self._workers.clear()
+        self._queues.clear()
+
+    def queue_depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        secret = self.settings.secret_token
+        if secret and not hmac.compare_digest(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), secret):
+            self.rejected += 1
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        if self.dispatch:
+            if not self.dispatch(data):
+                return web.Response(status=503)
+            self.received += 1
+            return web.Response()
+        update = Update.de_json(data, self.application.bot)
+        chat_id = update.effective_chat.id if update.effective_chat else update.update_id
+        queue = self._queues[hash(chat_id) % len(self._queues)]
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            # Telegram redelivers on non-2xx, which is the backpressure we want
+            return web.Response(status=503)
+        self.received += 1
+        return web.Response()
+
+    async def _work(self, queue: asyncio.Queue) -> None:
+        """Start the shard's updates in order; the processor decides how many run at once"""
+        while True:
+            update = await queue.get()
+            try:
+                await self._slots.acquire()
+                task = asyncio.get_running_loop().create_task(self._process(update))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            finally:
+                queue.task_done()
+
+    async def _process(self, update: Update) -> None:
+        application = self.application
+        try:
+            await application.update_processor.process_update(update, application.process_update(update))
+        except Exception as e:
+            logging.error(f"Webhook update {update.update_id} failed: {str(e)}")
+        finally:
+            self._slots.release()
+
+
+def install_stop_signals(stop_event: asyncio.Event) -> asyncio.Event:
+    """Set `stop_event` on SIGINT/SIGTERM where the loop supports it"""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: fall back to KeyboardInterrupt
+    return stop_event
+
+
+async def serve_webhook(application: Application, settings: WebhookSettings,
+                        stop_event: Optional[asyncio.Event] = None) -> None:
+    """Run the application behind the webhook server until stopped"""
+    stop_event = stop_event or install_stop_signals(asyncio.Event())
+
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    server = WebhookServer(application, settings)
+    await server.start()
+    try:
+        if settings.url:
+            await application.bot.set_webhook(
+                url=settings.url.rstrip("/") + settings.path,
+                secret_token=settings.secret_token,
+                max_connections=settings.max_connections,
+                drop_pending_updates=settings.drop_pending_updates
+            )
+        await stop_event.wait()
+    finally:
+        await server.stop()
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
@@ -0,0 +1,268 @@
+"""
+Multi-process deployment mode.
+One ingress process receives updates (long polling or webhook) and routes
+each raw update by chat id onto one of N worker processes. Every worker
+runs its own Application and processes its updates concurrently through the
+app's update processor (ChatOrderedUpdateProcessor), so order within a chat
+is kept while chats spread across cores.
+
+Each worker owns a pipe and grants the ingress one credit per free update
+slot (the processor's max_concurrent_updates), handing a credit back as each
+update finishes; everything beyond that waits in the ingress process. When a
+worker dies a supervisor starts a replacement on a fresh pipe, and the
+waiting updates go to it (only the updates in flight at the crash are lost).
+
+In-memory state (LLM cache, auto-comment jobs, rate limits) is per worker;
+SQLite-backed state (seen posts, TTS index) is shared through the files.
+"""
+import asyncio
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import sys
+from multiprocessing.connection import Connection
+from typing import List, Optional
+
+from telegram import Bot, Update
+
+from runner import run
+from webhook import WebhookServer, WebhookSettings, install_stop_signals
+
+READY = b"ready"
+STOP = b""
+
+
+def chat_key(update: dict) -> int:
+    """Routing key for a raw update: its chat id, else sender id, else update id"""
+    for value in update.values():
+        if isinstance(value, dict):
+            chat = value.get("chat") or (value.get("message") or {}).get("chat")
+            if chat and "id" in chat:
+                return int(chat["id"])
+            sender = value.get("from")
+            if sender and "id" in sender:
+                return int(sender["id"])
+    return int(update.get("update_id", 0))
+
+
+def _load_bot(bot_path: str):
+    """Import the bot script, reusing the copy multiprocessing already ran as __mp_main__"""
+    existing = sys.modules.get("__mp_main__")
+    if existing and os.path.abspath(getattr(existing, "__file__", "")) == os.path.abspath(bot_path):
+        return existing
+    spec = importlib.util.spec_from_file_location("telegram_bot", bot_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def worker_main(bot_path: str, index: int, conn: Connection) -> None:
+    """Entry point of a worker process"""
+    logging.basicConfig(level=logging.INFO, format=f"[worker {index}] %(levelname)s %(message)s")
+    os.environ["BOT_WORKER_INDEX"] = str(index)
+    module = _load_bot(bot_path)
+    run(_worker_loop(module.build_application(), conn, index), getattr(module, "BOT_LOOP", "asyncio"))
+
+
+async def _process(application, update: Update, conn: Connection) -> None:
+    """Run one update through the app's update processor, then hand its credit back"""
+    try:
+        await application.update_processor.process_update(update, application.process_update(update))
+    except Exception as e:
+        logging.error(f"Update {update.update_id} failed: {str(e)}")
+    finally:
+        try:
+            conn.send_bytes(READY)
+        except OSError:
+            pass  # ingress is gone
+
+
+async def _worker_loop(application, conn: Connection, index: int) -> None:
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+    loop = asyncio.get_running_loop()
+    window = application.update_processor.max_concurrent_updates
+    running = set()
+    logging.info(f"👷 Worker {index} ready (pid {os.getpid()}, {window} concurrent updates)")
+    try:
+        for _ in range(window):
+            conn.send_bytes(READY)
+        while True:
+            raw = await loop.run_in_executor(None, conn.recv_bytes)
+            if raw == STOP:
+                break
+            update = Update.de_json(json.loads(raw), application.bot)
+            # Tasks reach the per-chat lock in arrival order, which keeps each chat ordered
+            task = loop.create_task(_process(application, update, conn))
+            running.add(task)
+            task.add_done_callback(running.discard)
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+    finally:
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+
+
+class WorkerPool:
+    """Chat-sharded pool of bot worker processes with crash detection"""
+
+    def __init__(self, bot_path: str, processes: int = 2, queue_size: int = 1000, check_interval: float = 1.0):
+        self.bot_path = bot_path
+        self.processes = max(1, processes)
+        self.queue_size = queue_size
+        self.check_interval = check_interval
+        self.restarts = 0
+        self.dispatched = 0
+        self.dropped = 0
+        self._ctx = multiprocessing.get_context("spawn")
+        self._pending: List[asyncio.Queue] = []  # updates a worker has not asked for yet
+        self._carry: List[Optional[bytes]] = []  # update whose hand-off failed, sent first to the replacement
+        self._workers: List[Optional[multiprocessing.Process]] = []
+        self._feeders: List[Optional[asyncio.Task]] = []
+        self._supervisor: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        for index in range(self.processes):
+            self._pending.append(asyncio.Queue(self.queue_size))
+            self._carry.append(None)
+            self._workers.append(None)
+            self._feeders.append(None)
+            self._spawn(index)
+        self._supervisor = asyncio.get_running_loop().create_task(self._supervise())
+
+    def _spawn(self, index: int) -> None:
+        """Start worker `index` on a fresh pipe; a dead worker's pipe is never reused"""
+        ours, theirs = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=worker_main, args=(self.bot_path, index, theirs), name=f"bot-worker-{index}"
+        )
+        process.start()
+        theirs.close()  # so our end sees EOF when the worker dies
+        self._workers[index] = process
+        self._feeders[index] = asyncio.get_running_loop().create_task(self._feed(index, ours))
+
+    async def _feed(self, index: int, conn: Connection) -> None:
+        """Hand the worker one update per credit it grants"""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await loop.run_in_executor(None, conn.recv_bytes)
+                raw = self._carry[index]
+                if raw is None:
+                    raw = await self._pending[index].get()
+                self._carry[index] = raw
+                await loop.run_in_executor(None, conn.send_bytes, raw)
+                self._carry[index] = None
+                if raw == STOP:
+                    return
+        except (EOFError, OSError):
+            pass  # worker died; the supervisor restarts it and the carry goes to the replacement
+        finally:
+            conn.close()
+
+    def _queue_for(self, update: dict) -> asyncio.Queue:
+        return self._pending[chat_key(update) % self.processes]
+
+    def dispatch(self, update: dict) -> bool:
+        """Non-blocking hand-off; False when the chat's worker backlog is full"""
+        try:
+            self._queue_for(update).put_nowait(json.dumps(update).encode())
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.dispatched += 1
+        return True
+
+    async def dispatch_wait(self, update: dict) -> None:
+        """Blocking hand-off used by polling ingress for backpressure"""
+        await self._queue_for(update).put(json.dumps(update).encode())
+        self.dispatched += 1
+
+    async def _supervise(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            for index, process in enumerate(self._workers):
+                if not process.is_alive() and not (self._stopping and process.exitcode == 0):
+                    logging.error(f"💥 Worker {index} exited with code {process.exitcode}; restarting "
+                                  f"with {self._pending[index].qsize()} updates waiting")
+                    self.restarts += 1
+                    self._feeders[index].cancel()
+                    self._spawn(index)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let workers drain their waiting updates, then stop them (terminating after `timeout`)"""
+        loop = asyncio.get_running_loop()
+        self._stopping = True
+        try:
+            async with asyncio.timeout(timeout):
+                for pending in self._pending:
+                    await pending.put(STOP)  # behind the waiting updates
+                for process in self._workers:
+                    await loop.run_in_executor(None, process.join)
+        except TimeoutError:
+            logging.warning(f"Workers did not drain within {timeout:.0f}s; terminating")
+        finally:
+            if self._supervisor:
+                self._supervisor.cancel()
+        for process in self._workers:
+            if process.is_alive():
+                process.terminate()
+        for feeder in self._feeders:
+            feeder.cancel()
+        await asyncio.gather(*self._feeders, return_exceptions=True)
+
+
+async def _poll(bot: Bot, pool: WorkerPool, stop_event: asyncio.Event, timeout: int) -> None:
+    offset = None
+    await bot.delete_webhook()
+    while not stop_event.is_set():
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=timeout, allowed_updates=Update.ALL_TYPES)
+        except Exception as e:
+            logging.error(f"getUpdates failed: {str(e)}")
+            await asyncio.sleep(1)
+            continue
+        for update in updates:
+            await pool.dispatch_wait(update.to_dict())
+            offset = update.update_id + 1
+
+
+async def serve_multiprocess(token: str, bot_path: str, processes: int, mode: str = "polling",
+                             webhook: Optional[WebhookSettings] = None, queue_size: int = 1000,
+                             base_url: Optional[str] = None, stop_event: Optional[asyncio.Event] = None) -> None:
+    """Run the ingress process: receive updates and shard them onto worker processes"""
+    stop_event = stop_event or install_stop_signals(asyncio.Event())
+    bot = Bot(token, base_url=base_url) if base_url else Bot(token)
+    await bot.initialize()
+    pool = WorkerPool(bot_path, processes, queue_size)
+    pool.start()
+    logging.info(f"🚚 Ingress ({mode}) dispatching to {processes} worker processes")
+    server = None
+    try:
+        if mode == "webhook":
+            webhook = webhook or WebhookSettings()
+            server = WebhookServer(None, webhook, dispatch=pool.dispatch)
+            await server.start()
+            if webhook.url:
+                await bot.set_webhook(
+                    url=webhook.url.rstrip("/") + webhook.path,
+                    secret_token=webhook.secret_token,
+                    max_connections=webhook.max_connections,
+                    drop_pending_updates=webhook.drop_pending_updates
+                )
+            await stop_event.wait()
+        else:
+            poller = asyncio.create_task(_poll(bot, pool, stop_event, timeout=30))
+            await stop_event.wait()
+            poller.cancel()
+            await asyncio.gather(poller, return_exceptions=True)
+    finally:
+        if server:
+            await server.stop()
+        await pool.stop()
+        await bot.shutdown()